@@ -0,0 +1,152 @@
+import math
+import time
+import sqlite3
+import threading
+
+
+# Admission control: token bucket per kunci (IP, NISN) dan batas jumlah request yang diproses
+# bersamaan dengan antrean pendek. Bucket bisa disimpan di memori (per proses) atau di file SQLite
+# lokal agar semua worker gunicorn di mesin yang sama berbagi batas yang sama.
+PRUNE_EVERY = 1000  # Bersihkan bucket yang lama tidak dipakai setiap N pemanggilan take()
+
+
+def parse_rate(spec):
+    # "20/60" -> kapasitas 20 token, terisi ulang 20 token per 60 detik. Kosong/"0" = nonaktif.
+    if not spec or spec.strip() in ("0", "off"):
+        return None
+    burst, _, period = spec.partition("/")
+    burst = float(burst)
+    period = float(period or 1)
+    if burst <= 0 or period <= 0:
+        return None
+    return burst, burst / period
+
+
+def _refill(tokens, updated, now, burst, rate):
+    return min(burst, tokens + max(0.0, now - updated) * rate)
+
+
+def _consume(tokens, rate):
+    # (boleh, sisa token, detik sampai satu token tersedia)
+    if tokens >= 1:
+        return True, tokens - 1, 0.0
+    return False, tokens, (1 - tokens) / rate
+
+
+class MemoryBucketStore:
+    def __init__(self, idle_ttl=3600):
+        self.idle_ttl = idle_ttl
+        self._buckets = {}  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+        self._calls = 0
+
+    def take(self, key, burst, rate):
+        now = time.time()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            allowed, tokens, retry_after = _consume(_refill(tokens, updated, now, burst, rate), rate)
+            self._buckets[key] = (tokens, now)
+            self._calls += 1
+            if self._calls % PRUNE_EVERY == 0:
+                cutoff = now - self.idle_ttl
+                self._buckets = {k: v for k, v in self._buckets.items() if v[1] >= cutoff}
+        return allowed, retry_after
+
+
+# Busy handler SQLite (timeout di sqlite3.connect) menunggu dengan sleep di dalam C, sehingga di worker
+# gevent seluruh event loop ikut berhenti. Karena itu busy handler dimatikan (timeout=0) dan lock tulis
+# dicoba ulang di Python dengan time.sleep, yang di-patch gevent sehingga greenlet lain tetap jalan.
+class SqliteBucketStore:
+    LOCK_POLL_INTERVAL = 0.005  # Jeda antar percobaan BEGIN IMMEDIATE saat database terkunci (detik)
+
+    def __init__(self, path, idle_ttl=3600, busy_timeout=1.0):
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self.busy_timeout = busy_timeout
+        self._lock = threading.Lock()
+        self._conn = None
+        self._calls = 0
+
+    def _connect(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")  # Data batas request boleh hilang saat crash
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def _begin(self, conn):
+        # BEGIN IMMEDIATE mengunci tulis antar proses, jadi baca-ubah-tulis bucket atomik
+        deadline = time.monotonic() + self.busy_timeout
+        while True:
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) or time.monotonic() >= deadline:
+                    raise
+            time.sleep(self.LOCK_POLL_INTERVAL)
+
+    def take(self, key, burst, rate):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            self._begin(conn)
+            try:
+                row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                tokens = burst if row is None else _refill(row[0], row[1], now, burst, rate)
+                allowed, tokens, retry_after = _consume(tokens, rate)
+                conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                             (key, tokens, now))
+                self._calls += 1
+                if self._calls % PRUNE_EVERY == 0:
+                    conn.execute("DELETE FROM buckets WHERE updated < ?", (now - self.idle_ttl,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return allowed, retry_after
+
+
+# Batas request yang diproses bersamaan dalam satu proses. Jika penuh, request menunggu di antrean
+# (maksimal max_queue request, paling lama queue_timeout detik); selebihnya langsung ditolak.
+class ConcurrencyLimiter:
+    def __init__(self, max_active, max_queue=0, queue_timeout=1.0):
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            if self.active < self.max_active:
+                self.active += 1
+                return True
+            if self.waiting >= self.max_queue:
+                return False
+            self.waiting += 1
+            try:
+                deadline = time.monotonic() + self.queue_timeout
+                while self.active >= self.max_active:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                self.active += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+
+def retry_after_header(seconds):
+    return str(max(1, math.ceil(seconds)))
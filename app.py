@@ -1,17 +1,46 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, send_file
-import pandas as pd
+from flask import Flask, render_template, request, redirect, url_for, jsonify, send_file, Response, stream_with_context, g
+from werkzeug.middleware.proxy_fix import ProxyFix
+from markupsafe import escape
+from cache_manager import CacheManager
+from schedule_store import ScheduleStore
+import metrics
+import admission
+import lazy
 import os
 import json
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
-from google.oauth2 import service_account
 import io
-from dotenv import load_dotenv
-import requests
+import gzip
+import base64
+import hashlib
+import hmac
+import mimetypes
+import queue
+import threading
+import time
+import functools
+import click
 from datetime import datetime
+from bisect import bisect_right
+from collections import namedtuple
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pytz import timezone
-from dateutil.parser import isoparse
-from dateutil import parser
+try:
+    import brotli
+except ImportError:  # Kompresi brotli opsional, gzip selalu tersedia
+    brotli = None
+
+# Modul berat dimuat saat pertama kali dipakai (lihat lazy.py dan `flask import-profile`)
+pd = lazy.LazyModule("pandas")
+np = lazy.LazyModule("numpy")
+requests = lazy.LazyModule("requests")
+service_account = lazy.LazyModule("google.oauth2.service_account")
+httplib2 = lazy.LazyModule("httplib2")
+build = lazy.lazy_callable("googleapiclient.discovery", "build")
+MediaIoBaseDownload = lazy.lazy_callable("googleapiclient.http", "MediaIoBaseDownload")
+AuthorizedHttp = lazy.lazy_callable("google_auth_httplib2", "AuthorizedHttp")
+isoparse = lazy.lazy_callable("dateutil.parser", "isoparse")
+AESGCM = lazy.lazy_callable("cryptography.hazmat.primitives.ciphers.aead", "AESGCM")  # Hanya untuk `flask export-hasil`
 
 app = Flask(__name__)
 secret_key = os.urandom(24)  # Generate a random secret key for session management
@@ -22,343 +51,1516 @@ if os.getenv("VERCEL") is None:  # Deteksi bukan di Vercel
     from dotenv import load_dotenv
     load_dotenv()
 
-# Buat file credentials.json dari ENV
-credentials_json = os.getenv("CREDENTIALS_JSON")
-
-if credentials_json:
-    # Tentukan lokasi file yang bisa ditulis (di Vercel /tmp)
-    CREDENTIALS_FILE = '/tmp/credentials.json' if os.getenv('VERCEL') else 'credentials.json'
-    
-    # Menulis file credentials.json (di /tmp jika di Vercel)
-    with open(CREDENTIALS_FILE, 'w') as f:
-        f.write(credentials_json)
-else:
-    raise EnvironmentError("CREDENTIALS_JSON tidak ditemukan dalam environment variables")
+# Kredensial service account dibaca langsung dari ENV saat klien Drive pertama kali dibuat
+# (tanpa menulis credentials.json ke disk), jadi request yang tidak menyentuh Drive tidak membayarnya
+CREDENTIALS_JSON = os.getenv("CREDENTIALS_JSON")
 
 # SCOPES dan folder_id diambil dari ENV
 SCOPES = ["https://www.googleapis.com/auth/drive.readonly"]
 FOLDER_ID_SISWA = os.getenv("FOLDER_ID_SISWA") 
 FOLDER_ID_SURAT = os.getenv("FOLDER_ID_SURAT")
 FILE_NAME_SISWA = "data_siswa.xlsx"
+# Klien Drive: batas waktu request, umur listing folder (detik), dan jeda minimum refresh listing saat file tidak ditemukan
+DRIVE_TIMEOUT = float(os.getenv("DRIVE_TIMEOUT", "30"))
+DRIVE_LISTING_TTL = float(os.getenv("DRIVE_LISTING_TTL", "300"))
+DRIVE_LISTING_MISS_REFRESH = float(os.getenv("DRIVE_LISTING_MISS_REFRESH", "30"))
+DRIVE_FILE_FIELDS = "id, name, mimeType, size, md5Checksum, modifiedTime"
 
 # Tentukan cache direktori, pastikan di /tmp di Vercel
 CACHE_DIR = "/tmp/cache" if os.getenv("VERCEL") else "./cache"
 os.makedirs(CACHE_DIR, exist_ok=True)
 
+# Batas direktori cache (0 = tanpa batas) dan kebijakan eviksi (lru/lfu). Di Vercel /tmp terbatas,
+# jadi default-nya dibatasi. Data siswa dan snapshot-nya tidak pernah dievict.
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(400 * 1024 * 1024) if os.getenv("VERCEL") else "0"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "0"))
+CACHE_EVICTION_POLICY = os.getenv("CACHE_EVICTION_POLICY", "lru")
+
+# Unduhan file: ukuran chunk dari Drive, tipe file yang di-cache, dan umur cache di browser
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("DOWNLOAD_CHUNK_SIZE", str(1024 * 1024)))
+CACHEABLE_EXTENSIONS = ('pdf', 'xlsx')
+DOWNLOAD_MAX_AGE = int(os.getenv("DOWNLOAD_MAX_AGE", "300"))
+# Aktifkan jika di belakang nginx/apache yang mendukung X-Sendfile
+app.config['USE_X_SENDFILE'] = os.getenv("USE_X_SENDFILE") == "1"
+
+# Warm-up cache surat: jumlah unduhan paralel, lokasi manifest, dan interval laporan progres
+WARMUP_WORKERS = int(os.getenv("WARMUP_WORKERS", "8"))
+WARMUP_MANIFEST_FILE = os.path.join(CACHE_DIR, ".warmup_manifest.json")
+WARMUP_MANIFEST_EVERY = 20
+WARMUP_REPORT_INTERVAL = 5.0
+
+# Snapshot biner data siswa (dibuat dengan `flask build-snapshot`), opsional ikut dibundel saat deploy
+SNAPSHOT_NAME = "data_siswa.snapshot.npy"
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR")
+
+cache = CacheManager(
+    CACHE_DIR,
+    max_bytes=CACHE_MAX_BYTES,
+    max_entries=CACHE_MAX_ENTRIES,
+    policy=CACHE_EVICTION_POLICY,
+    pinned=(FILE_NAME_SISWA, SNAPSHOT_NAME, SNAPSHOT_NAME + '.json')
+)
+
+# Feed perubahan Drive (changes.list): interval polling (detik, 0 = nonaktif) dan TTL listing folder
+# selama feed aktif, karena perubahan di folder sudah terdeteksi lewat feed. Di Vercel thread
+# background tidak berjalan di antara request, jadi default nonaktif (pakai `flask poll-drive-changes`).
+DRIVE_CHANGES_INTERVAL = float(os.getenv("DRIVE_CHANGES_INTERVAL", "0" if os.getenv("VERCEL") else "60"))
+DRIVE_CHANGES_LISTING_TTL = float(os.getenv("DRIVE_CHANGES_LISTING_TTL", "3600"))
+DRIVE_CHANGES_STATE_FILE = os.path.join(CACHE_DIR, ".drive_changes.json")
+
+# Penyimpanan jadwal lokal dan jeda sebelum perubahan dikirim ke Gist (detik). Perubahan selama jeda
+# digabung ke satu PATCH; di Vercel langsung dikirim karena thread background bisa dibekukan.
+schedule_store = ScheduleStore(os.path.join(CACHE_DIR, ".schedule_store.json"), cache.single_flight)
+SCHEDULE_SYNC_DELAY = float(os.getenv("SCHEDULE_SYNC_DELAY", "0" if os.getenv("VERCEL") else "2"))
+SCHEDULE_SYNC_RETRY = float(os.getenv("SCHEDULE_SYNC_RETRY", "30"))
+
+# Shard hasil statis (dibuat dengan `flask export-hasil`) untuk dilayani langsung dari CDN.
+# Aktif di halaman jika URL dan salt diisi; salt hanya dikirim ke browser selama form aktif.
+# Catatan keamanan: ada/tidaknya shard di CDN bisa ditebak tanpa batas request (batas per NISN di
+# server tidak berlaku). Yang tahu NISN seseorang cukup mencoba ~1.100 tanggal lahir; tiap tebakan
+# dibuat mahal oleh PBKDF2 (RESULT_SHARDS_ITERATIONS), tetapi tetap bisa dilakukan. Isi shard
+# terenkripsi, jadi salinan direktori shard tidak membocorkan apa pun tanpa NISN dan tanggal lahir.
+# Deploy: static/hasil/ sengaja di-.gitignore (berisi data semua siswa). Publikasikan direktori itu
+# dari salinan lokal (mis. `vercel deploy` dari direktori kerja, atau sinkronkan ke bucket/CDN yang
+# ditunjuk RESULT_SHARDS_URL), jangan di-commit ke repository.
+RESULT_SHARDS_URL = os.getenv("RESULT_SHARDS_URL", "").rstrip("/")
+RESULT_SHARDS_SALT = os.getenv("RESULT_SHARDS_SALT", "")
+RESULT_SHARDS_ITERATIONS = int(os.getenv("RESULT_SHARDS_ITERATIONS", "100000"))
+RESULT_SHARDS_NAME_BYTES = 16
+RESULT_SHARDS_KEY_BYTES = 32
+RESULT_SHARDS_DIR = os.path.join("static", "hasil")
+RESULT_SHARDS_MANIFEST = os.path.join(CACHE_DIR, ".result_shards_manifest.json")
+RESULT_SHARDS_CLIENT = {
+    "url": RESULT_SHARDS_URL,
+    "salt": RESULT_SHARDS_SALT,
+    "iterations": RESULT_SHARDS_ITERATIONS,
+    "nameBytes": RESULT_SHARDS_NAME_BYTES,
+    "keyBytes": RESULT_SHARDS_KEY_BYTES,
+} if RESULT_SHARDS_URL and RESULT_SHARDS_SALT else None
+
+# Warm-up opsional: muat modul berat, klien Drive, dan indeks siswa di thread latar belakang segera
+# setelah app di-import (mis. worker gunicorn yang hidup lama), bukan saat request pertama.
+# Default nonaktif agar cold start serverless tetap ringan.
+PRELOAD_ON_START = os.getenv("PRELOAD_ON_START", "0") == "1"
+PRELOAD_MODULES = (
+    "pandas", "numpy", "openpyxl", "requests", "dateutil.parser", "httplib2",
+    "google.oauth2.service_account", "google_auth_httplib2", "googleapiclient.discovery", "googleapiclient.http",
+)
+
+# Batas jumlah baris file unggahan cek kelulusan massal. Endpoint massal hanya aktif jika ADMIN_TOKEN
+# diisi (token dikirim lewat header Authorization: Bearer atau field form admin_token); tanpa token
+# gunakan `flask cek-massal`. Batas per IP-nya terpisah karena satu request berisi ribuan baris.
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "20000"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+RATE_LIMIT_BULK = admission.parse_rate(os.getenv("RATE_LIMIT_BULK", "5/600"))
+
+# Request yang lebih lama dari ini (ms) dicatat beserta rincian per tahap; 0 = nonaktif
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+
 GIST_ID = os.getenv("GIST_ID")
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 GIST_FILENAME = "schedule.json"
+# Umur cache jadwal (detik) dan batas waktu request ke GitHub
+SCHEDULE_CACHE_TTL = float(os.getenv("SCHEDULE_CACHE_TTL", "30"))
+GIST_TIMEOUT = float(os.getenv("GIST_TIMEOUT", "10"))
+
+# Mode serving: "sync" (default) atau "gevent" (lihat gunicorn.conf.py). Di mode gevent panggilan
+# Gist/Drive menjadi kooperatif, jadi ukuran pool koneksi disesuaikan dengan jumlah request bersamaan
+ASYNC_MODE = os.getenv("ASYNC_MODE", "sync").lower()
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "50" if ASYNC_MODE == "gevent" else "10"))
+IO_WORKERS = int(os.getenv("IO_WORKERS", "8"))
+
+# Klien HTTP Gist bersama: koneksi keep-alive ke api.github.com dipakai ulang antar request
+# (dibuat saat request Gist pertama agar import requests tidak ikut dibayar di cold start)
+def _buat_gist_http():
+    session = requests.Session()
+    session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE))
+    return session
+
+gist_http = lazy.LazyObject(_buat_gist_http)
+
+# Executor untuk I/O yang saling independen dalam satu request (mis. indeks siswa saat jadwal dicek)
+io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+
+# Admission control untuk pencarian kelulusan dan unduhan. Format batas "jumlah/detik" (mis. "60/60"
+# = 60 request per menit, boleh beruntun sampai 60); "0" menonaktifkan batas tersebut.
+RATE_LIMIT_IP = admission.parse_rate(os.getenv("RATE_LIMIT_IP", "60/60"))
+RATE_LIMIT_NISN = admission.parse_rate(os.getenv("RATE_LIMIT_NISN", "10/600"))
+RATE_LIMIT_DOWNLOAD = admission.parse_rate(os.getenv("RATE_LIMIT_DOWNLOAD", "30/60"))
+# "sqlite": bucket dibagi semua worker di mesin yang sama; "memory": per proses
+RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "sqlite").lower()
+# Request yang diproses bersamaan per proses, panjang antrean, dan lama maksimal menunggu di antrean
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "100" if ASYNC_MODE == "gevent" else "32"))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "64"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
+# Jumlah proxy di depan aplikasi yang X-Forwarded-For-nya dipercaya (Vercel: 1)
+TRUSTED_PROXY_COUNT = int(os.getenv("TRUSTED_PROXY_COUNT", "1" if os.getenv("VERCEL") else "0"))
+
+if RATE_LIMIT_STORE == "sqlite":
+    rate_limit_store = admission.SqliteBucketStore(os.path.join(CACHE_DIR, ".ratelimit.sqlite3"))
+else:
+    rate_limit_store = admission.MemoryBucketStore()
+admission_limiter = admission.ConcurrencyLimiter(
+    MAX_CONCURRENT_REQUESTS, ADMISSION_QUEUE_SIZE, ADMISSION_QUEUE_TIMEOUT
+) if MAX_CONCURRENT_REQUESTS else None
+
+if TRUSTED_PROXY_COUNT:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_COUNT)
+
 
+# Kredensial service account dibuat sekali per proses; token akses dipakai ulang sampai kedaluwarsa
+_drive_credentials = None
+_drive_local = threading.local()
+_drive_lock = threading.Lock()
+_drive_pool = queue.LifoQueue()  # Klien Drive yang dikembalikan request yang sudah selesai
+
+def _get_drive_credentials():
+    global _drive_credentials
+    if _drive_credentials is None:
+        with _drive_lock:
+            if _drive_credentials is None:
+                if not CREDENTIALS_JSON:
+                    raise EnvironmentError("CREDENTIALS_JSON tidak ditemukan dalam environment variables")
+                _drive_credentials = service_account.Credentials.from_service_account_info(
+                    json.loads(CREDENTIALS_JSON), scopes=SCOPES
+                )
+    return _drive_credentials
 
 # Fungsi autentikasi ke Google Drive
+# httplib2 tidak thread-safe, jadi tiap thread memegang klien sendiri (dengan koneksi persisten),
+# sedangkan kredensial dan tokennya dipakai bersama oleh semua thread.
+# Klien diambil dari pool jika ada; request mengembalikannya lewat release_google_drive saat selesai
+# (di mode gevent "thread" adalah greenlet per request, jadi tanpa pool klien dibangun ulang tiap request)
 def authenticate_google_drive():
-    creds = service_account.Credentials.from_service_account_file(
-        CREDENTIALS_FILE, scopes=SCOPES
-    )
-    return build('drive', 'v3', credentials=creds)
+    service = getattr(_drive_local, 'service', None)
+    if service is None:
+        try:
+            service = _drive_pool.get_nowait()
+        except queue.Empty:
+            http = AuthorizedHttp(_get_drive_credentials(), http=httplib2.Http(timeout=DRIVE_TIMEOUT))
+            with metrics.span('drive_auth'):
+                service = build('drive', 'v3', http=http, cache_discovery=False)
+        _drive_local.service = service
+    return service
+
+def release_google_drive():
+    service = getattr(_drive_local, 'service', None)
+    if service is not None:
+        del _drive_local.service
+        _drive_pool.put(service)
+
+# Peta nama file -> metadata per folder, diisi dari satu listing folder dan diperbarui sesuai TTL
+# (disimpan sebagai (waktu monotonic, listing, waktu wall saat listing mulai diambil))
+_folder_listings = {}
+_folder_listing_errors = {}
+_folder_listing_lock = threading.Lock()
+
+# Ambil semua file dalam folder, mengikuti nextPageToken
+def list_folder_files(service, folder_id):
+    query = f"'{folder_id}' in parents and trashed = false"
+    files = []
+    page_token = None
+    while True:
+        metrics.inc('ceklulus_external_calls_total', service='drive', operation='files.list')
+        with metrics.span('drive_list'):
+            results = service.files().list(
+                q=query,
+                fields=f"nextPageToken, files({DRIVE_FILE_FIELDS})",
+                pageSize=1000,
+                pageToken=page_token
+            ).execute()
+        files.extend(results.get('files', []))
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            return files
+
+# Listing masih bisa dipakai jika belum melewati max_age dan feed perubahan Drive tidak mencatat
+# perubahan di folder ini sejak listing diambil. Selama feed aktif, TTL default diperpanjang.
+def _folder_listing_fresh(cached, folder_id, max_age):
+    if not cached:
+        return False
+    fetched_at, _, fetched_wall = cached
+    changes = read_drive_changes_state()
+    if changes["folders"].get(folder_id, 0) >= fetched_wall:
+        return False
+    if max_age is None:
+        max_age = DRIVE_CHANGES_LISTING_TTL if drive_changes_healthy(changes) else DRIVE_LISTING_TTL
+    return time.monotonic() - fetched_at < max_age
+
+def get_folder_listing(service, folder_id, max_age=None):
+    cached = _folder_listings.get(folder_id)
+    if _folder_listing_fresh(cached, folder_id, max_age):
+        return cached[1]
+
+    with _folder_listing_lock:
+        # Cek ulang, mungkin thread lain baru saja memperbarui listing
+        cached = _folder_listings.get(folder_id)
+        if _folder_listing_fresh(cached, folder_id, max_age):
+            return cached[1]
+        fetched_wall = time.time()
+        listing = {}
+        try:
+            items = list_folder_files(service, folder_id)
+        except Exception:
+            _folder_listing_errors[folder_id] = time.monotonic()
+            raise
+        for item in items:
+            listing.setdefault(item['name'], item)  # Sama seperti sebelumnya: file pertama yang cocok
+        _folder_listings[folder_id] = (time.monotonic(), listing, fetched_wall)
+        print(f"Listing folder {folder_id} diperbarui: {len(listing)} file.")
+        return listing
+
+def get_file_metadata(service, folder_id, file_name):
+    metadata = get_folder_listing(service, folder_id).get(file_name)
+    if metadata is None:
+        # File mungkin baru diunggah; refresh listing, tapi dibatasi agar nama yang memang
+        # tidak ada tidak memicu listing folder di setiap request
+        metadata = get_folder_listing(service, folder_id, DRIVE_LISTING_MISS_REFRESH).get(file_name)
+    return metadata
 
 # Fungsi mendapatkan file ID dari nama file & folder
 def get_file_id(service, folder_id, file_name):
-    query = f"name = '{file_name}' and '{folder_id}' in parents and trashed = false"
-    results = service.files().list(q=query, fields="files(id, name)").execute()
-    items = results.get('files', [])
-    return items[0]['id'] if items else None
+    metadata = get_file_metadata(service, folder_id, file_name)
+    return metadata['id'] if metadata else None
+
+# Normalisasi kolom data siswa agar siap dipakai untuk pencarian
+def normalize_student_data(df):
+    # Cek kolom yang ada di DataFrame
+    print(f"Kolom yang ditemukan di file: {df.columns.tolist()}")
+    # Normalisasi kolom jika ada
+    if 'nisn' in df.columns:
+        df['nisn'] = df['nisn'].astype(str).str.strip()
+    if 'tanggal_lahir' in df.columns:
+        df['tanggal_lahir'] = pd.to_datetime(df['tanggal_lahir'], errors='coerce').dt.strftime('%Y-%m-%d')
+    if 'status_kelulusan' in df.columns:
+        df['status_kelulusan'] = df['status_kelulusan'].str.upper().str.strip()
+    # Tambahkan normalisasi untuk kolom status_skl
+    if 'status_skl' in df.columns:
+        df['status_skl'] = df['status_skl'].str.upper().str.strip()
+    return df
+
+# Bentuk data siswa yang sama untuk semua jalur pemuatan (Excel maupun snapshot): semua kolom string,
+# sel kosong menjadi ''. Tanpa ini status kosong bernilai NaN dari Excel tetapi '' dari snapshot.
+def canonical_student_frame(df):
+    return df.fillna('').astype(str)
+
+# Hash isi file, dipakai sebagai kunci snapshot
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _snapshot_paths(directory):
+    path = os.path.join(directory, SNAPSHOT_NAME)
+    return path, path + '.json'
+
+# Simpan data siswa (sudah dinormalisasi) sebagai snapshot NumPy fixed-width, urut berdasarkan NISN
+def write_student_snapshot(df, source_hash, directory=None):
+    directory = directory or CACHE_DIR
+    os.makedirs(directory, exist_ok=True)
+    snapshot_path, meta_path = _snapshot_paths(directory)
+
+    df = canonical_student_frame(df)
+    if 'nisn' in df.columns:
+        # Urutan stabil: baris pertama untuk NISN yang sama tetap di depan
+        df = df.sort_values('nisn', kind='stable')
+    column_dtypes = {
+        col: f"U{max(1, int(df[col].str.len().max() or 0))}" for col in df.columns
+    }
+    records = df.to_records(index=False, column_dtypes=column_dtypes)
+
+    # Tulis ke file sementara lalu rename agar pembaca tidak melihat snapshot setengah jadi
+    tmp_path = snapshot_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.save(f, records, allow_pickle=False)
+    os.replace(tmp_path, snapshot_path)
+    with open(meta_path + '.tmp', 'w') as f:
+        json.dump({
+            "source_sha256": source_hash,
+            "columns": df.columns.tolist(),
+            "rows": len(df),
+            "created": datetime.now(timezone('Asia/Jakarta')).isoformat()
+        }, f)
+    os.replace(meta_path + '.tmp', meta_path)
+    print(f"Snapshot data siswa disimpan di {snapshot_path} ({len(df)} baris).")
+    return snapshot_path
+
+# Muat snapshot yang cocok dengan hash file sumber, None jika tidak ada atau basi
+def load_student_snapshot(source_hash):
+    directories = [CACHE_DIR]
+    if SNAPSHOT_DIR:
+        directories.append(SNAPSHOT_DIR)
+    for directory in directories:
+        snapshot_path, meta_path = _snapshot_paths(directory)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get("source_sha256") != source_hash:
+                continue
+            with metrics.span('snapshot_load'):
+                records = np.load(snapshot_path, mmap_mode='r', allow_pickle=False)
+                df = pd.DataFrame.from_records(records)
+            print(f"Menggunakan snapshot data siswa dari {snapshot_path}.")
+            return df
+        except (OSError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"Snapshot {snapshot_path} tidak bisa dibaca: {e}")
+    return None
+
+# Baca data siswa dari snapshot jika masih valid, jika tidak parse file Excel lalu buat snapshot baru
+def read_student_data(source, source_hash):
+    df = load_student_snapshot(source_hash)
+    if df is not None:
+        return df
+    with metrics.span('read_excel'):
+        df = canonical_student_frame(normalize_student_data(pd.read_excel(source)))
+    try:
+        write_student_snapshot(df, source_hash)
+    except Exception as e:
+        print(f"Gagal menyimpan snapshot data siswa: {e}")
+    return df
 
 # Fungsi untuk memuat data siswa dan menyimpan ke cache
-# Fungsi untuk memuat data siswa dan menyimpan ke cache
-def load_student_data_from_drive():
+def load_student_data_from_drive(_retry=True):
     try:
-        # Nama file yang digunakan untuk cache
-        cached_file_path = os.path.join(CACHE_DIR, FILE_NAME_SISWA)
-        
-        # Jika file sudah ada di cache, langsung baca dari cache
-        if os.path.exists(cached_file_path):
-            print(f"File {FILE_NAME_SISWA} sudah di-cache. Menggunakan data cache.")
-            try:
-                with open(cached_file_path, 'rb') as f:
-                    file_data = f.read()
-                    df = pd.read_excel(io.BytesIO(file_data))
-            except Exception as e:
-                print(f"Error reading cached file: {e}")
-                print("Cache kemungkinan korup. Menghapus dan mencoba mengunduh ulang dari Google Drive...")
-                os.remove(cached_file_path)  # Hapus file cache rusak
-                return load_student_data_from_drive()  # Coba ulang
-        else:
-            # Jika file belum ada di cache, ambil dari Google Drive
-            print(f"File {FILE_NAME_SISWA} belum ada di cache. Mengunduh dari Drive...")
-            service = authenticate_google_drive()
-            file_id = get_file_id(service, FOLDER_ID_SISWA, FILE_NAME_SISWA)
-            if not file_id:
-                print("File tidak ditemukan di folder siswa.")
-                return pd.DataFrame()
-            request = service.files().get_media(fileId=file_id)
-            fh = io.BytesIO()
-            downloader = MediaIoBaseDownload(fh, request)
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
-            fh.seek(0)
-            try:
-                # Baca langsung dari stream untuk file yang diunduh
-                df = pd.read_excel(fh)
-            except Exception as e:
-                print(f"Error reading downloaded file: {e}")
-                return pd.DataFrame()  # Mengembalikan DataFrame kosong jika gagal membaca file
-            # Simpan file yang diunduh ke cache
-            with open(cached_file_path, 'wb') as f:
-                f.write(fh.getvalue())  # Pastikan menggunakan getvalue() untuk menulis ke file
-            print(f"File {FILE_NAME_SISWA} berhasil diunduh dan disimpan di cache.")
-        # Cek kolom yang ada di DataFrame
-        print(f"Kolom yang ditemukan di file: {df.columns.tolist()}")
-        # Normalisasi kolom jika ada
-        if 'nisn' in df.columns:
-            df['nisn'] = df['nisn'].astype(str).str.strip()
-        if 'tanggal_lahir' in df.columns:
-            df['tanggal_lahir'] = pd.to_datetime(df['tanggal_lahir'], errors='coerce').dt.strftime('%Y-%m-%d')
-        if 'status_kelulusan' in df.columns:
-            df['status_kelulusan'] = df['status_kelulusan'].str.upper().str.strip()
-        # Tambahkan normalisasi untuk kolom status_skl
-        if 'status_skl' in df.columns:
-            df['status_skl'] = df['status_skl'].str.upper().str.strip()
-        return df
+        # Ambil dari cache jika masih sesuai versi di Drive, jika tidak unduh ulang (single-flight, atomik)
+        cached_file_path = download_file_from_drive(FILE_NAME_SISWA, FOLDER_ID_SISWA)
+        if not cached_file_path:
+            print("File tidak ditemukan di folder siswa.")
+            return pd.DataFrame()
+
+        source_hash = file_sha256(cached_file_path)
+        try:
+            return read_student_data(cached_file_path, source_hash)
+        except Exception as e:
+            print(f"Error reading cached file: {e}")
+            print("Cache kemungkinan korup. Menghapus dan mencoba mengunduh ulang dari Google Drive...")
+            with cache.single_flight(FILE_NAME_SISWA):
+                # Hapus hanya jika belum diganti worker lain selama kita membaca
+                if os.path.exists(cached_file_path) and file_sha256(cached_file_path) == source_hash:
+                    cache.remove(FILE_NAME_SISWA)  # Hapus file cache rusak
+            if _retry:
+                return load_student_data_from_drive(_retry=False)  # Coba ulang sekali
+            return pd.DataFrame()
     except Exception as e:
         print(f"Error loading student data: {e}")
         return pd.DataFrame()
 
-# Fungsi untuk mengunduh dan menyimpan file ke cache lokal
+# Indeks data siswa di memori (NISN -> record), dipakai bersama oleh semua request
+_student_index = {}
+_student_index_key = None
+_student_index_checked_at = 0.0
+_student_index_lock = threading.Lock()
+_student_index_refreshing = threading.Event()
+
+def _student_source_key():
+    # Kunci versi file sumber: berubah jika file cache diganti atau dimodifikasi
+    cached_file_path = os.path.join(CACHE_DIR, FILE_NAME_SISWA)
+    try:
+        stat = os.stat(cached_file_path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _build_student_index(df):
+    index = {}
+    if 'nisn' not in df.columns:
+        return index
+    for record in df.to_dict('records'):
+        nisn = record.get('nisn')
+        if not nisn or nisn in index:
+            continue  # Sama seperti sebelumnya: baris pertama untuk NISN yang sama yang dipakai
+        # Format tanggal untuk ditampilkan dihitung sekali di sini, bukan per request
+        tanggal_siswa = record.get('tanggal_lahir')
+        try:
+            tanggal_siswa_obj = datetime.strptime(tanggal_siswa, '%Y-%m-%d')
+            record['tanggal_lahir_format'] = tanggal_siswa_obj.strftime('%d %B %Y')
+        except (TypeError, ValueError):
+            record['tanggal_lahir_format'] = tanggal_siswa
+        index[nisn] = record
+    return index
+
+# Saat indeks belum ada (cold start), mulai memuat data siswa di latar belakang agar berjalan
+# bersamaan dengan pengambilan jadwal; cari_kelulusan lalu menunggu di lock indeks yang sama
+def prefetch_student_index():
+    if _student_index_key is None and not _student_index_lock.locked():
+        io_executor.submit(get_student_index)
+
+def _load_student_index():
+    df = load_student_data_from_drive()
+    with metrics.span('student_index_build'):
+        index = _build_student_index(df)
+    # File cache baru ada setelah diunduh, jadi ambil kunci setelah load
+    return index, _student_source_key() if index else None
+
+def _set_student_index(index, key):
+    global _student_index, _student_index_key, _student_index_checked_at
+    # Indeks diganti sebelum kuncinya, jadi pembaca yang melihat kunci baru juga melihat indeks baru
+    _student_index = index
+    _student_index_key = key
+    _student_index_checked_at = time.monotonic()
+    print(f"Indeks data siswa dibangun ulang: {len(index)} NISN.")
+
+def _revalidate_student_index():
+    global _student_index_checked_at
+    try:
+        key = _student_source_key()
+        if key is not None and key == _student_index_key \
+                and is_cache_current(FILE_NAME_SISWA, FOLDER_ID_SISWA):
+            _student_index_checked_at = time.monotonic()
+            return
+        # File berubah di Drive atau diganti worker lain: bangun indeks baru tanpa lock,
+        # lock hanya dipakai untuk menukar indeks
+        index, key = _load_student_index()
+        if index:
+            with _student_index_lock:
+                _set_student_index(index, key)
+        else:
+            # Data baru tidak terbaca (mis. Drive gagal): indeks lama tetap dipakai sampai TTL berikutnya
+            _student_index_checked_at = time.monotonic()
+    except Exception as e:
+        print(f"Gagal memvalidasi indeks data siswa: {e}")
+        _student_index_checked_at = time.monotonic()
+    finally:
+        _student_index_refreshing.clear()
+
+def _revalidate_student_index_in_background():
+    if _student_index_refreshing.is_set():
+        return
+    _student_index_refreshing.set()
+    threading.Thread(target=_revalidate_student_index, daemon=True).start()
+
+# Setelah indeks pertama ada, request tidak pernah menunggu Drive: sama seperti load_schedule,
+# indeks yang ada tetap dilayani selama versinya dicek (paling sering sekali per TTL) dan,
+# jika berubah, dibangun ulang di background. Hanya cold start yang menunggu di lock indeks.
+def get_student_index():
+    key = _student_source_key()
+    if _student_index_key is not None:
+        if key != _student_index_key or time.monotonic() - _student_index_checked_at >= DRIVE_LISTING_TTL:
+            metrics.inc('ceklulus_student_index_total', result='stale')
+            _revalidate_student_index_in_background()
+        else:
+            metrics.inc('ceklulus_student_index_total', result='hit')
+        return _student_index
+
+    with _student_index_lock:
+        # Cek ulang, mungkin thread lain sudah membangun indeks
+        if _student_index_key is not None:
+            return _student_index
+        metrics.inc('ceklulus_student_index_total', result='miss')
+        index, key = _load_student_index()
+        if key is not None:
+            _set_student_index(index, key)
+        return index
+
+# Target tulis untuk MediaIoBaseDownload: chunk ditulis ke file sementara (jika ada)
+# sekaligus ditampung sebentar untuk diteruskan ke klien
+class _ChunkSink:
+    def __init__(self, fh=None):
+        self.fh = fh
+        self.pending = []
+
+    def write(self, data):
+        if self.fh is not None:
+            self.fh.write(data)
+        self.pending.append(bytes(data))
+        return len(data)
+
+def drive_version(metadata):
+    if not metadata:
+        return None
+    return metadata.get('md5Checksum') or metadata.get('modifiedTime')
+
+# True jika file cache sama dengan versi terbaru di Drive. Jika Drive tidak bisa dicek,
+# file cache tetap dianggap valid agar situs tetap bisa melayani.
+def is_cache_current(file_name, folder_id):
+    failed_at = _folder_listing_errors.get(folder_id)
+    if failed_at and time.monotonic() - failed_at < DRIVE_LISTING_MISS_REFRESH:
+        return True
+    try:
+        service = authenticate_google_drive()
+        metadata = get_folder_listing(service, folder_id).get(file_name)
+    except Exception as e:
+        print(f"Tidak bisa memeriksa versi {file_name} di Drive: {e}")
+        _folder_listing_errors[folder_id] = time.monotonic()
+        return True
+    version = drive_version(metadata)
+    if version is None:
+        return True
+
+    recorded = cache.get_version(file_name)
+    if recorded != version:
+        # Mungkin worker lain sudah mengunduh versi baru; indeks proses ini belum melihatnya
+        recorded = cache.get_version(file_name, fresh=True)
+    if recorded is None and metadata.get('md5Checksum'):
+        # File cache lama tanpa catatan versi: cocokkan md5 sekali lalu catat
+        cache_file_path = cache.path(file_name)
+        if cache_file_path and os.path.isfile(cache_file_path) and file_md5(cache_file_path) == version:
+            cache.set_version(file_name, version)
+            return True
+    return recorded == version
+
+def _iter_local_file(path_or_file):
+    f = open(path_or_file, 'rb') if isinstance(path_or_file, str) else path_or_file
+    with f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b''):
+            yield chunk
+
+def _stat_key(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+# Unduh file dari Drive ke cache secara atomik (file sementara lalu rename), jadi pembaca tidak melihat
+# file setengah jadi. Unduhan ke nama yang sama dijalankan single-flight: yang menunggu memakai file
+# hasil pemimpin. Lock hanya dipegang selama unduhan dari Drive, tidak pernah selama data dikirim ke
+# klien, jadi klien yang lambat tidak menahan request lain untuk file yang sama.
+# Mengembalikan file cache yang sudah dibuka (dibuka sebelum lock dilepas, aman dari eviksi/penggantian).
+def _fill_drive_cache(service, file_id, cache_name, version=None):
+    local_cache_path = cache.path(cache_name)
+    before = _stat_key(local_cache_path)
+    with cache.single_flight(cache_name):
+        current = _stat_key(local_cache_path)
+        # Versi dibaca ulang dari indeks di disk: worker lain mungkin sudah mengunduh versi ini
+        # sebelum kita mulai menunggu (file sudah berganti sebelum `before` diambil)
+        terbaru = bool(version) and cache.get_version(cache_name, fresh=True) == version
+        if current is None or (current == before and not terbaru):
+            with cache.open_write(cache_name, version) as fh:
+                for _ in _iter_drive_chunks(service, file_id, fh):
+                    pass
+        # Jika tidak, worker lain sudah mengunduh file ini selama kita menunggu
+        return open(local_cache_path, 'rb')
+
+def fill_drive_cache(service, file_id, cache_name, version=None):
+    _fill_drive_cache(service, file_id, cache_name, version).close()
+    return cache.path(cache_name)
+
+# Generator chunk file dari Drive. Jika cache_name diisi, file diunduh dulu ke cache lalu dikirim dari disk.
+def iter_drive_file(service, file_id, cache_name=None, version=None):
+    if cache_name is None:
+        yield from _iter_drive_chunks(service, file_id)
+        return
+    yield from _iter_local_file(_fill_drive_cache(service, file_id, cache_name, version))
+
+def _iter_drive_chunks(service, file_id, fh=None):
+    sink = _ChunkSink(fh)
+    request = service.files().get_media(fileId=file_id)
+    downloader = MediaIoBaseDownload(sink, request, chunksize=DOWNLOAD_CHUNK_SIZE)
+    metrics.inc('ceklulus_external_calls_total', service='drive', operation='get_media')
+    done = False
+    while not done:
+        with metrics.span('drive_download'):
+            status, done = downloader.next_chunk()
+        for chunk in sink.pending:
+            yield chunk
+        sink.pending.clear()
+
+def _is_cacheable(file_name):
+    return file_name.rsplit('.', 1)[-1].lower() in CACHEABLE_EXTENSIONS
+
+# Mulai streaming file dari Drive; None jika file tidak ditemukan
+def stream_file_from_drive(file_name, folder_id):
+    try:
+        service = authenticate_google_drive()
+        metadata = get_file_metadata(service, folder_id, file_name)
+    except Exception as e:
+        print(f"Error downloading file: {e}")
+        return None
+    if not metadata:
+        return None
+    cache_name = file_name if _is_cacheable(file_name) and cache.path(file_name) else None
+    return iter_drive_file(service, metadata['id'], cache_name, drive_version(metadata))
+
+# Fungsi untuk mengunduh dan menyimpan file ke cache lokal, mengembalikan path file cache
 def download_file_from_drive(file_name, folder_id):
-    # Cek apakah file sudah ada di cache
-    cached_file = download_file_from_cache(file_name)
+    # Cek apakah file sudah ada di cache dan masih sesuai versi di Drive
+    cached_file = download_file_from_cache(file_name, folder_id, check_version=True)
     if cached_file:
+        print(f"File {file_name} sudah di-cache. Menggunakan data cache.")
         return cached_file
 
+    if not _is_cacheable(file_name):
+        print(f"File {file_name} tidak termasuk tipe file yang di-cache.")
+        return None
+
     try:
         service = authenticate_google_drive()
-        file_id = get_file_id(service, folder_id, file_name)
-        if not file_id:
+        metadata = get_file_metadata(service, folder_id, file_name)
+        if not metadata or not cache.path(file_name):
             return None
+        return fill_drive_cache(service, metadata['id'], file_name, drive_version(metadata))
+    except Exception as e:
+        print(f"Error downloading file: {e}")
+        return None
 
-        request = service.files().get_media(fileId=file_id)
-        fh = io.BytesIO()
-        downloader = MediaIoBaseDownload(fh, request)
+# Fungsi untuk memeriksa file yang sudah ter-cache, mengembalikan path file cache.
+# Jika check_version aktif, file yang versinya sudah berbeda dengan Drive dianggap tidak ada.
+def download_file_from_cache(file_name, folder_id=None, check_version=False):
+    validate = (lambda name: is_cache_current(name, folder_id)) if check_version else None
+    return cache.get(file_name, validate)
 
-        done = False
-        while not done:
-            status, done = downloader.next_chunk()
+# render_template dengan span waktu untuk metrics
+def render_timed(template_name, **context):
+    with metrics.span('render_template'):
+        return render_template(template_name, **context)
 
-        fh.seek(0)
+@app.before_request
+def _mulai_timer_request():
+    g.request_started = time.perf_counter()
 
-        # Tentukan ekstensi file dan cache
-        file_extension = file_name.split('.')[-1].lower()
-        local_cache_path = f'./cache/{file_name}'
+@app.after_request
+def _catat_durasi_request(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    endpoint = request.endpoint or 'tidak_dikenal'
+    metrics.observe('ceklulus_request_duration_seconds', elapsed,
+                    endpoint=endpoint, method=request.method, status=response.status_code)
+    # Log request lambat beserta rincian waktu per tahap
+    if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+        print(f"Request lambat: {request.method} {request.path} {elapsed * 1000:.1f} ms "
+              f"[{metrics.format_spans(metrics.request_spans()) or 'tanpa span'}]")
+    return response
 
-        # Caching berdasarkan ekstensi file
-        if file_extension in ['pdf', 'xlsx']:
-            with open(local_cache_path, 'wb') as f:
-                f.write(fh.getvalue())
-        
-        return fh
+@app.teardown_appcontext
+def _kembalikan_klien_drive(exc):
+    # Dipanggil setelah respons (termasuk stream) selesai, jadi klien tidak dipakai dua request sekaligus
+    release_google_drive()
+
+# Endpoint metrics format Prometheus (per proses/worker)
+@app.route('/metrics')
+def metrics_endpoint():
+    stats = cache.stats()
+    gauges = [
+        ('ceklulus_cache_bytes', {}, stats['bytes']),
+        ('ceklulus_cache_entries', {}, stats['entries']),
+    ]
+    # Counter cache file dibaca dari CacheManager saat scrape
+    counters = [
+        ('ceklulus_cache_events_total', {'event': event}, stats[event])
+        for event in ('hits', 'misses', 'stale', 'writes', 'evictions')
+    ]
+    gauges += [
+        ('ceklulus_lazy_import_seconds', {'module': name}, round(seconds, 6))
+        for name, seconds in sorted(lazy.import_times.items())
+    ]
+    if admission_limiter is not None:
+        gauges += [
+            ('ceklulus_admission_active', {}, admission_limiter.active),
+            ('ceklulus_admission_waiting', {}, admission_limiter.waiting),
+        ]
+    body = metrics.registry.render(gauges, counters)
+    response = Response(body, mimetype='text/plain; version=0.0.4')
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+ERROR_TERLALU_SERING = 'Terlalu banyak percobaan. Mohon tunggu sebentar lalu coba lagi.'
+ERROR_SERVER_SIBUK = 'Server sedang sibuk. Mohon coba lagi dalam beberapa detik.'
+
+def _take_token(key, limit):
+    burst, rate = limit
+    try:
+        return rate_limit_store.take(key, burst, rate)
     except Exception as e:
-        print(f"Error downloading file: {e}")
-        return None
+        # Penyimpanan batas bermasalah (mis. SQLite terkunci terlalu lama): loloskan request
+        print(f"Rate limiter tidak tersedia, request diloloskan: {e}")
+        return True, 0.0
 
-# Fungsi untuk memeriksa file yang sudah ter-cache
-def download_file_from_cache(file_name):
-    cache_file_path = f'./cache/{file_name}'
-    if os.path.exists(cache_file_path):
-        with open(cache_file_path, 'rb') as f:
-            return io.BytesIO(f.read())
-    return None
+def _nisn_dari_request():
+    # Body JSON yang bukan objek (mis. list) diabaikan; view yang memutuskan responsnya
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        payload = request.form
+    nisn = payload.get('nisn')
+    return nisn.strip()[:32] if isinstance(nisn, str) else None
+
+# Halaman penolakan untuk form HTML dibuat sekali per pesan: saat server kebanjiran request, penolakan
+# tidak boleh ikut membaca jadwal dan merender index.html lengkap
+_HALAMAN_TOLAK = {
+    message: (
+        '<!DOCTYPE html><html lang="id"><head><meta charset="UTF-8">'
+        '<meta name="viewport" content="width=device-width, initial-scale=1.0">'
+        '<title>Pengumuman Kelulusan | MA Nurul Ummah</title>'
+        f'<link rel="stylesheet" href="{app.static_url_path}/output.css"></head>'
+        '<body class="min-h-screen flex items-center justify-center bg-gray-50 p-4">'
+        '<div class="max-w-md w-full bg-white rounded-xl shadow p-6 text-center">'
+        f'<p class="text-gray-700 mb-4">{escape(message)}</p>'
+        '<a class="text-blue-600 font-medium" href="/">Kembali</a></div></body></html>'
+    ).encode('utf-8')
+    for message in (ERROR_TERLALU_SERING, ERROR_SERVER_SIBUK)
+}
+
+# Tolak request dengan cepat: halaman statis berisi pesan error untuk form HTML, JSON untuk lainnya
+def _tolak_request(status, retry_after, message, reason):
+    metrics.inc('ceklulus_admission_rejected_total', endpoint=request.endpoint, reason=reason)
+    if request.endpoint == 'cek_kelulusan':
+        response = Response(_HALAMAN_TOLAK[message], status=status, mimetype='text/html')
+    else:
+        response = jsonify({'success': False, 'message': message})
+        response.status_code = status
+    response.headers['Retry-After'] = admission.retry_after_header(retry_after)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+# Batasi request per IP (dan per NISN untuk pencarian, mencegah brute force tanggal lahir), lalu
+# batasi jumlah request yang diproses bersamaan. Untuk stream dari Drive slot baru dilepas
+# setelah body selesai dikirim.
+def admission_control(ip_limit, scope, check_nisn=False, methods=('POST',)):
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in methods:
+                return view(*args, **kwargs)
+
+            limits = [(f"ip:{scope}:{request.remote_addr}", ip_limit, 'ip')]
+            if check_nisn:
+                nisn = _nisn_dari_request()
+                if nisn:
+                    limits.append((f"nisn:{nisn}", RATE_LIMIT_NISN, 'nisn'))
+            for key, limit, reason in limits:
+                if limit is None:
+                    continue
+                allowed, retry_after = _take_token(key, limit)
+                if not allowed:
+                    return _tolak_request(429, retry_after, ERROR_TERLALU_SERING, reason)
+
+            if admission_limiter is None:
+                return view(*args, **kwargs)
+            if not admission_limiter.acquire():
+                return _tolak_request(503, ADMISSION_QUEUE_TIMEOUT, ERROR_SERVER_SIBUK, 'overload')
+            try:
+                response = app.make_response(view(*args, **kwargs))
+            except Exception:
+                admission_limiter.release()
+                raise
+            if response.is_streamed and not response.direct_passthrough:
+                response.call_on_close(admission_limiter.release)
+            else:
+                # File cache lokal (send_file) dikirim langsung oleh server tanpa memanggil call_on_close,
+                # dan murah karena tidak menyentuh Drive, jadi slot langsung dilepas
+                admission_limiter.release()
+            return response
+        return wrapper
+    return decorator
+
+# Metadata file surat yang boleh diunduh, None jika nama tidak ada di listing folder surat.
+# Direktori cache juga berisi data siswa, snapshot, dan metadata (dotfile) yang tidak boleh
+# dilayani lewat /download, jadi nama file selalu dicocokkan dengan listing FOLDER_ID_SURAT.
+# Jika Drive sedang tidak bisa diakses, listing terakhir yang diketahui dipakai.
+def get_surat_metadata(filename):
+    if not filename or filename.startswith('.') or filename in cache.pinned:
+        return None
+    cached = _folder_listings.get(FOLDER_ID_SURAT)
+    failed_at = _folder_listing_errors.get(FOLDER_ID_SURAT)
+    if cached and failed_at and time.monotonic() - failed_at < DRIVE_LISTING_MISS_REFRESH:
+        return cached[1].get(filename)
+    try:
+        service = authenticate_google_drive()
+        return get_file_metadata(service, FOLDER_ID_SURAT, filename)
+    except Exception as e:
+        print(f"Tidak bisa memeriksa listing folder surat: {e}")
+        if cached:
+            return cached[1].get(filename)
+        raise
 
 @app.route('/download/<filename>')
+@admission_control(RATE_LIMIT_DOWNLOAD, 'download', methods=('GET', 'HEAD'))
 def download(filename):
-    # Cek apakah file sudah ada di cache
-    cache_file_path = f'./cache/{filename}'
-    if os.path.exists(cache_file_path):
-        return send_file(cache_file_path, as_attachment=True, download_name=filename)
+    try:
+        metadata = get_surat_metadata(filename)
+    except Exception:
+        return jsonify({'success': False, 'message': 'Layanan file sedang tidak tersedia. Coba lagi nanti.'}), 503
+    if metadata is None:
+        return jsonify({'success': False, 'message': 'File tidak ditemukan'}), 404
+
+    # Cek apakah file sudah ada di cache: send_file memakai sendfile/X-Sendfile,
+    # dan mendukung conditional GET (ETag/Last-Modified) serta Range
+    cache_file_path = download_file_from_cache(filename, FOLDER_ID_SURAT, check_version=True)
+    if cache_file_path:
+        return send_file(cache_file_path, as_attachment=True, download_name=filename,
+                         conditional=True, etag=True, max_age=DOWNLOAD_MAX_AGE)
     
-    # Jika file belum ada di cache, unduh dari Google Drive
-    file_stream = download_file_from_drive(filename, FOLDER_ID_SURAT)
+    # Jika file belum ada di cache, stream dari Google Drive ke klien sambil disimpan ke cache
+    file_stream = stream_file_from_drive(filename, FOLDER_ID_SURAT)
     if file_stream:
-        return send_file(file_stream, as_attachment=True, download_name=filename)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        if request.method == 'HEAD':
+            # Cukup pastikan file ada, jangan mulai unduhan (dan jangan memegang lock single-flight)
+            file_stream.close()
+            file_stream = iter(())
+        response = Response(stream_with_context(file_stream), mimetype=mimetype)
+        response.headers.set('Content-Disposition', 'attachment', filename=filename)
+        return response
     else:
         return jsonify({'success': False, 'message': 'File tidak ditemukan'}), 404
     
+# Halaman tanpa hasil pencarian (hitung mundur, form tutup, atau form terbuka) hanya bergantung pada
+# jadwal aktif & berikutnya, jadi dirender dan dikompresi sekali lalu dipakai ulang sampai salah satunya
+# berganti. Waktu server untuk hitung mundur diambil browser dari /api/waktu, bukan ditanam di HTML.
+# Entri disimpan sebagai satu tuple (form_aktif, next_schedule, varian) agar diganti secara atomik.
+_page_cache = {"entry": None}
+PAGE_ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+
+def _render_halaman_jadwal(form_aktif, next_schedule):
+    # Jika ada jadwal berikutnya, ambil timestamp target-nya
+    server_target_timestamp = int(next_schedule['mulai_obj'].timestamp() * 1000) if next_schedule else None
+    body = render_timed(
+        'index.html',
+        hasil=None,
+        data=None,
+        error=None,
+        form_aktif=form_aktif,
+        next_schedule=next_schedule,
+        server_target_timestamp=server_target_timestamp,
+        result_shards=RESULT_SHARDS_CLIENT
+    ).encode('utf-8')
+    etag = hashlib.sha1(body).hexdigest()
+    # ETag berbeda per Content-Encoding karena isi byte-nya berbeda
+    variants = {'identity': (body, etag), 'gzip': (gzip.compress(body, 9), etag + '-gzip')}
+    if brotli:
+        variants['br'] = (brotli.compress(body), etag + '-br')
+    return variants
+
+def halaman_jadwal_response(form_aktif, next_schedule):
+    entry = _page_cache["entry"]
+    if entry is None or entry[0] is not form_aktif or entry[1] is not next_schedule:
+        metrics.inc('ceklulus_page_cache_total', result='miss')
+        entry = (form_aktif, next_schedule, _render_halaman_jadwal(form_aktif, next_schedule))
+        _page_cache["entry"] = entry
+    else:
+        metrics.inc('ceklulus_page_cache_total', result='hit')
+
+    encoding = request.accept_encodings.best_match(PAGE_ENCODINGS) or 'identity'
+    body, etag = entry[2][encoding]
+    response = Response(body, mimetype='text/html')
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.set_etag(etag)
+    # Browser selalu memvalidasi ulang (304 tanpa body) agar pergantian jadwal langsung terlihat
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
 @app.route('/')
 def index():
     form_aktif, next_schedule = get_schedule_status()
+    return halaman_jadwal_response(form_aktif, next_schedule)
 
-    # Ambil waktu sekarang dari Asia/Jakarta dan konversi ke timestamp dalam milidetik
-    now = datetime.now(timezone('Asia/Jakarta'))
-    server_current_timestamp = int(now.timestamp() * 1000)
+# Waktu server (ms) untuk sinkronisasi hitung mundur di halaman yang di-cache
+@app.route('/api/waktu')
+def api_waktu():
+    response = jsonify({'now': int(time.time() * 1000)})
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
-    # Jika ada jadwal berikutnya, ambil timestamp target-nya
-    server_target_timestamp = int(next_schedule['mulai_obj'].timestamp() * 1000) if next_schedule else None
+# Pesan error pencarian kelulusan, dipakai bersama oleh halaman HTML dan API JSON
+ERROR_FORM_TUTUP = 'Form tidak tersedia saat ini.'
+ERROR_TANGGAL_TIDAK_VALID = 'Format tanggal lahir tidak valid. Gunakan format YYYY-MM-DD.'
+ERROR_TANGGAL_TIDAK_SESUAI = 'Tanggal lahir tidak sesuai dengan data NISN. Mohon periksa kembali.'
+ERROR_NISN_TIDAK_DITEMUKAN = 'NISN tidak ditemukan. Mohon periksa kembali nomor NISN Anda.'
+ERROR_PROSES = 'Terjadi kesalahan dalam memproses data. Mohon coba lagi.'
 
-    return render_template(
-        'index.html', 
-        hasil=None, 
-        data=None, 
-        error=None, 
-        form_aktif=form_aktif, 
-        next_schedule=next_schedule, 
-        server_current_timestamp=server_current_timestamp,
-        server_target_timestamp=server_target_timestamp
-    )
+# Cari hasil kelulusan berdasarkan NISN dan tanggal lahir (YYYY-MM-DD).
+# Mengembalikan (hasil, data_siswa, error) dengan hasil 'lulus', 'tidak_lulus', atau None jika error.
+def cari_kelulusan(nisn, tanggal_lahir_str):
+    # Konversi input tanggal lahir dari form HTML (YYYY-MM-DD). Input yang salah format adalah
+    # kesalahan pengguna, bukan kesalahan server, jadi divalidasi sebelum blok try di bawah
+    try:
+        tanggal_lahir_obj = datetime.strptime(tanggal_lahir_str.strip(), '%Y-%m-%d')
+    except ValueError:
+        return None, None, ERROR_TANGGAL_TIDAK_VALID
+    tanggal_lahir_formatted = tanggal_lahir_obj.strftime('%Y-%m-%d')  # Normalisasi ke format YYYY-MM-D
+
+    try:
+        # Cari siswa berdasarkan NISN dari indeks di memori (tanpa parse Excel per request)
+        student_index = get_student_index()
+        with metrics.span('student_lookup'):
+            data_siswa = student_index.get(nisn.strip())
+        if data_siswa is None:
+            # NISN tidak ditemukan
+            return None, None, ERROR_NISN_TIDAK_DITEMUKAN
+
+        # Salin record agar indeks bersama tidak ikut berubah
+        data_siswa = dict(data_siswa)
+        
+        # Tanggal lahir di indeks sudah dinormalisasi ke YYYY-MM-DD
+        tanggal_siswa = data_siswa['tanggal_lahir']
+
+        # PERUBAHAN: Debug untuk melihat format tanggal
+        print(f"Membandingkan tanggal: input={tanggal_lahir_formatted}, database={tanggal_siswa}")
+        
+        # PERUBAHAN: Bandingkan string tanggal secara langsung
+        if tanggal_lahir_formatted != tanggal_siswa:
+            # PERUBAHAN: Menambahkan debug info
+            print(f"Ketidakcocokan tanggal: Input={tanggal_lahir_formatted}, Database={tanggal_siswa}")
+            # Tanggal lahir tidak cocok
+            return None, None, ERROR_TANGGAL_TIDAK_SESUAI
+
+        # Tanggal cocok, lanjutkan ke pengecekan status kelulusan. Status kosong adalah kesalahan data,
+        # bukan "tidak lulus"
+        status_kelulusan = str(data_siswa.get('status_kelulusan') or '').strip().upper()
+        if not status_kelulusan:
+            print(f"Status kelulusan kosong untuk NISN {nisn.strip()}")
+            return None, None, ERROR_PROSES
+        if status_kelulusan == 'LULUS':
+            return 'lulus', data_siswa, None
+        return 'tidak_lulus', data_siswa, None
+    except Exception as e:
+        print(f"Error processing request: {e}")
+        return None, None, ERROR_PROSES
 
 @app.route('/cek-kelulusan', methods=['POST', "GET"])
+@admission_control(RATE_LIMIT_IP, 'cek', check_nisn=True)
 def cek_kelulusan():
+    if request.method == 'GET':
+        return halaman_jadwal_response(*get_schedule_status())
+
+    prefetch_student_index()
     form_aktif, next_schedule = get_schedule_status()
-    
-    now = datetime.now(timezone('Asia/Jakarta'))
-    server_current_timestamp = int(now.timestamp() * 1000)
+
     server_target_timestamp = int(next_schedule['mulai_obj'].timestamp() * 1000) if next_schedule else None
 
-    if request.method == 'POST':
-        if not form_aktif:
-            return render_template('index.html', 
-                                   hasil=None, 
-                                   data=None, 
-                                   error='Form tidak tersedia saat ini.', 
-                                   form_aktif=form_aktif,
-                                   next_schedule=next_schedule,
-                                   server_current_timestamp=server_current_timestamp,
-                                   server_target_timestamp=server_target_timestamp)
-        
-        nisn = request.form['nisn']
-        tanggal_lahir_str = request.form['tanggal_lahir']
-        
-        try:
-            # Konversi input tanggal lahir dari form HTML (YYYY-MM-DD)
-            tanggal_lahir_obj = datetime.strptime(tanggal_lahir_str, '%Y-%m-%d')
-            tanggal_lahir_formatted = tanggal_lahir_obj.strftime('%Y-%m-%d')  # Normalisasi ke format YYYY-MM-D
-            
-            # Load data siswa dari Excel/Drive
-            df = load_student_data_from_drive()
-          
-            # Cari siswa berdasarkan NISN
-            siswa = df[df['nisn'] == nisn]
-            
-            if not siswa.empty:
-                # Ambil data siswa pertama yang cocok dengan NISN
-                data_siswa = siswa.iloc[0].to_dict()
-                
-                # PERUBAHAN: Langsung gunakan tanggal_lahir dari spreadsheet untuk perbandingan
-                tanggal_siswa = data_siswa['tanggal_lahir']
-                
-                # Parsing tanggal dari spreadsheet secara fleksibel
-                try:
-                    tanggal_siswa_obj = parser.parse(tanggal_siswa)
-                    tanggal_siswa_formatted = tanggal_siswa_obj.strftime('%Y-%m-%d')  # Normalisasi
-                    data_siswa['tanggal_lahir_format'] = tanggal_siswa_obj.strftime('%d %B %Y')  # Untuk ditampilkan
-                except Exception as e:
-                    print(f"Error parsing tanggal dari spreadsheet: {e}")
-                    tanggal_siswa_formatted = tanggal_siswa  # Fallback pakai string asli
-                    data_siswa['tanggal_lahir_format'] = tanggal_siswa
-
-                
-                # PERUBAHAN: Debug untuk melihat format tanggal
-                print(f"Membandingkan tanggal: input={tanggal_lahir_formatted}, database={tanggal_siswa}")
-                
-                # PERUBAHAN: Bandingkan string tanggal secara langsung
-                if tanggal_lahir_formatted == tanggal_siswa_formatted:
-                    # Tanggal cocok, lanjutkan ke pengecekan status kelulusan
-                    if data_siswa['status_kelulusan'].upper() == 'LULUS':
-                        return render_template('index.html', 
-                                            hasil='lulus', 
-                                            data=data_siswa,
-                                            error=None,
-                                            form_aktif=form_aktif,
-                                            next_schedule=next_schedule,
-                                            server_current_timestamp=server_current_timestamp,
-                                            server_target_timestamp=server_target_timestamp)
-                    else:
-                        return render_template('index.html', 
-                                            hasil='tidak_lulus', 
-                                            data=data_siswa,
-                                            error=None,
-                                            form_aktif=form_aktif,
-                                            next_schedule=next_schedule,
-                                            server_current_timestamp=server_current_timestamp,
-                                            server_target_timestamp=server_target_timestamp)
-                else:
-                    # PERUBAHAN: Menambahkan debug info
-                    print(f"Ketidakcocokan tanggal: Input={tanggal_lahir_formatted}, Database={tanggal_siswa}")
-                    
-                    # Tanggal lahir tidak cocok
-                    return render_template('index.html', 
-                                        hasil=None, 
-                                        data=None,
-                                        error='Tanggal lahir tidak sesuai dengan data NISN. Mohon periksa kembali.',
-                                        form_aktif=form_aktif,
-                                        next_schedule=next_schedule,
-                                        server_current_timestamp=server_current_timestamp,
-                                        server_target_timestamp=server_target_timestamp)
-            else:
-                # NISN tidak ditemukan
-                return render_template('index.html', 
-                                    hasil=None, 
-                                    data=None,
-                                    error='NISN tidak ditemukan. Mohon periksa kembali nomor NISN Anda.',
-                                    form_aktif=form_aktif,
-                                    next_schedule=next_schedule,
-                                    server_current_timestamp=server_current_timestamp,
-                                    server_target_timestamp=server_target_timestamp)
-                                    
-        except Exception as e:
-            print(f"Error processing request: {e}")
-            return render_template('index.html', 
-                                hasil=None, 
-                                data=None, 
-                                error='Terjadi kesalahan dalam memproses data. Mohon coba lagi.',
-                                form_aktif=form_aktif,
-                                next_schedule=next_schedule,
-                                server_current_timestamp=server_current_timestamp,
-                                server_target_timestamp=server_target_timestamp)
+    hasil, data_siswa, error = None, None, None
+    if not form_aktif:
+        error = ERROR_FORM_TUTUP
     else:
-        return render_template('index.html', 
-                              hasil=None, 
-                              data=None, 
-                              error=None, 
-                              form_aktif=form_aktif,
-                              next_schedule=next_schedule,
-                              server_current_timestamp=server_current_timestamp,
-                              server_target_timestamp=server_target_timestamp)
-
-def load_schedule():
-    url = f"https://api.github.com/gists/{GIST_ID}"
-    headers = {"Authorization": f"token {GITHUB_TOKEN}"}
-    response = requests.get(url, headers=headers)
-    if response.status_code != 200:
-        print("Gagal mengambil jadwal:", response.status_code)
-        return []
+        hasil, data_siswa, error = cari_kelulusan(request.form['nisn'], request.form['tanggal_lahir'])
+
+    return render_timed('index.html', 
+                          hasil=hasil, 
+                          data=data_siswa, 
+                          error=error, 
+                          form_aktif=form_aktif,
+                          next_schedule=next_schedule,
+                          server_target_timestamp=server_target_timestamp,
+                          result_shards=RESULT_SHARDS_CLIENT)
+
+# Field data siswa yang dikirim lewat API (sama dengan yang ditampilkan di halaman)
+API_DATA_FIELDS = ('nama', 'nisn', 'tanggal_lahir_format', 'status_kelulusan', 'status_skl', 'file_pdf')
+
+# Kode status HTTP untuk tiap jenis error di API
+API_ERROR_STATUS = {
+    ERROR_FORM_TUTUP: 403,
+    ERROR_TANGGAL_TIDAK_VALID: 400,
+    ERROR_TANGGAL_TIDAK_SESUAI: 400,
+    ERROR_NISN_TIDAK_DITEMUKAN: 404,
+    ERROR_PROSES: 500,
+}
+
+# Versi JSON dari cek_kelulusan: validasi sama, tanpa render template
+@app.route('/api/cek-kelulusan', methods=['POST'])
+@admission_control(RATE_LIMIT_IP, 'cek', check_nisn=True)
+def api_cek_kelulusan():
+    prefetch_student_index()
+    form_aktif, _ = get_schedule_status()
+    payload = request.get_json(silent=True) or request.form
+    # Body JSON yang bukan objek (mis. [1,2]) diperlakukan seperti field yang kosong
+    if not isinstance(payload, dict):
+        payload = {}
+    nisn = payload.get('nisn')
+    tanggal_lahir_str = payload.get('tanggal_lahir')
+
+    if not form_aktif:
+        hasil, data_siswa, error = None, None, ERROR_FORM_TUTUP
+    elif not isinstance(nisn, str) or not isinstance(tanggal_lahir_str, str):
+        response = jsonify({'success': False, 'message': 'nisn dan tanggal_lahir wajib diisi.'})
+        response.status_code = 400
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    else:
+        hasil, data_siswa, error = cari_kelulusan(nisn, tanggal_lahir_str)
+
+    if error:
+        response = jsonify({'success': False, 'message': error})
+        response.status_code = API_ERROR_STATUS.get(error, 400)
+    else:
+        response = jsonify({
+            'success': True,
+            'hasil': hasil,
+            'data': {field: _json_value(data_siswa.get(field)) for field in API_DATA_FIELDS}
+        })
+    # Berisi data pribadi siswa, jangan disimpan di cache browser/CDN
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+def _json_value(value):
+    # NaN dari pandas tidak valid di JSON
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+# Cek kelulusan massal untuk wali kelas/TU: satu file CSV/XLSX berisi pasangan nisn,tanggal_lahir
+# dicocokkan sekaligus lewat satu merge pandas, bukan satu request /cek-kelulusan per siswa.
+# Format tanggal yang diterima dicoba berurutan per kolom (sel tanggal Excel terbaca 'YYYY-MM-DD HH:MM:SS').
+BULK_DATE_FORMATS = ('%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%d/%m/%Y', '%d-%m-%Y')
+BULK_DATA_FIELDS = ('nama', 'status_kelulusan', 'status_skl', 'file_pdf')
+
+def read_bulk_input(source, filename):
+    # NISN dibaca sebagai teks agar nol di depan tidak hilang
+    if os.path.splitext(filename or '')[1].lower() in ('.xlsx', '.xls'):
+        df = pd.read_excel(source, dtype=object)
+    else:
+        # Pemisah (koma/titik koma) dideteksi otomatis, BOM dari ekspor Excel diabaikan
+        df = pd.read_csv(source, dtype=str, sep=None, engine='python', encoding='utf-8-sig')
+    df.columns = df.columns.astype(str).str.strip().str.lower()
+    missing = [column for column in ('nisn', 'tanggal_lahir') if column not in df.columns]
+    if missing:
+        raise ValueError(f"Kolom wajib tidak ditemukan: {', '.join(missing)}")
+    if len(df) > BULK_MAX_ROWS:
+        raise ValueError(f"File berisi {len(df)} baris, maksimal {BULK_MAX_ROWS}.")
+    return df[['nisn', 'tanggal_lahir']]
+
+def normalize_nisn_column(series):
+    # Angka dari sel Excel bisa terbaca sebagai float (1234.0)
+    return series.fillna('').astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+
+def normalize_date_column(series):
+    text = series.fillna('').astype(str).str.strip()
+    parsed = pd.Series(pd.NaT, index=text.index, dtype='datetime64[ns]')
+    for fmt in BULK_DATE_FORMATS:
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(text[missing], format=fmt, errors='coerce')
+    return parsed.dt.strftime('%Y-%m-%d')
+
+# Status per baris: match, mismatch (tanggal lahir beda), not_found (NISN tidak ada),
+# atau invalid_date (tanggal tidak bisa dibaca). Data siswa hanya diisi untuk baris match,
+# sama seperti cek kelulusan satuan yang tidak menampilkan data jika tanggal salah.
+def cek_kelulusan_massal(df_input):
+    students = load_student_data_from_drive()
+    if 'nisn' not in students.columns or 'tanggal_lahir' not in students.columns:
+        # Data siswa kosong/tidak terbaca: semua baris dilaporkan not_found
+        students = pd.DataFrame(columns=['nisn', 'tanggal_lahir'])
+    with metrics.span('bulk_lookup'):
+        fields = [field for field in BULK_DATA_FIELDS if field in students.columns]
+        # Baris pertama untuk NISN yang sama yang dipakai, sama dengan indeks siswa
+        lookup = (students[['nisn', 'tanggal_lahir'] + fields]
+                  .drop_duplicates('nisn')
+                  .rename(columns={'nisn': 'nisn_data', 'tanggal_lahir': 'tanggal_lahir_data'}))
+
+        queries = pd.DataFrame({
+            'nisn': normalize_nisn_column(df_input['nisn']),
+            'tanggal_lahir': df_input['tanggal_lahir'],
+            'tanggal_lahir_input': normalize_date_column(df_input['tanggal_lahir']),
+        })
+        merged = queries.merge(lookup, left_on='nisn', right_on='nisn_data', how='left', validate='many_to_one')
+
+        found = merged['nisn_data'].notna()
+        valid_date = merged['tanggal_lahir_input'].notna()
+        match = found & valid_date & (merged['tanggal_lahir_input'] == merged['tanggal_lahir_data'])
+        merged['status'] = np.select(
+            [~found, ~valid_date, match],
+            ['not_found', 'invalid_date', 'match'],
+            default='mismatch'
+        )
+        status_kelulusan = merged['status_kelulusan'].fillna('').astype(str).str.strip().str.upper() \
+            if 'status_kelulusan' in fields else pd.Series('', index=merged.index)
+        # Status kosong di data siswa: hasil dibiarkan kosong, bukan dianggap tidak lulus
+        merged['hasil'] = np.where(match & (status_kelulusan != ''),
+                                   np.where(status_kelulusan == 'LULUS', 'lulus', 'tidak_lulus'), '')
+        merged[fields] = merged[fields].where(match, None)
+
+    counts = merged['status'].value_counts().to_dict()
+    print(f"Cek kelulusan massal: {len(merged)} baris, {counts}")
+    return merged[['nisn', 'tanggal_lahir', 'status', 'hasil'] + fields]
+
+def iter_csv(df, chunk_rows=1000):
+    # Hasil dikirim per potongan agar baris pertama sampai ke klien tanpa menunggu seluruh CSV
+    yield df.head(0).to_csv(index=False)
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].to_csv(index=False, header=False)
+
+# True jika request membawa ADMIN_TOKEN yang benar (dibandingkan dengan waktu konstan)
+def _token_admin_valid():
+    if not ADMIN_TOKEN:
+        return False
+    header = request.headers.get('Authorization', '')
+    token = header[len('Bearer '):] if header.startswith('Bearer ') else request.form.get('admin_token', '')
+    return hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8'))
+
+@app.route('/admin/cek-kelulusan-massal', methods=['POST'])
+@admission_control(RATE_LIMIT_BULK, 'massal')
+def admin_cek_kelulusan_massal():
+    # Hasil berisi nama dan status per NISN: tanpa otentikasi endpoint ini bisa dipakai menebak
+    # tanggal lahir ribuan kali dalam satu request, melewati batas per NISN
+    if not ADMIN_TOKEN:
+        response = jsonify({'success': False, 'message': 'Cek massal lewat web tidak aktif. Gunakan perintah `flask cek-massal`.'})
+        response.status_code = 403
+        return response
+    if not _token_admin_valid():
+        response = jsonify({'success': False, 'message': 'Token admin tidak valid.'})
+        response.status_code = 401
+        return response
+
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        response = jsonify({'success': False, 'message': 'File CSV/XLSX wajib diunggah.'})
+        response.status_code = 400
+        return response
+    try:
+        df_input = read_bulk_input(upload.stream, upload.filename)
+    except Exception as e:
+        print(f"File cek kelulusan massal tidak bisa dibaca: {e}")
+        response = jsonify({'success': False, 'message': f'File tidak bisa dibaca: {e}'})
+        response.status_code = 400
+        return response
+
+    hasil = cek_kelulusan_massal(df_input)
+    base_name = os.path.splitext(os.path.basename(upload.filename))[0] or 'data'
+    if (request.form.get('format') or request.args.get('format')) == 'xlsx':
+        buffer = io.BytesIO()
+        hasil.to_excel(buffer, index=False)
+        buffer.seek(0)
+        response = send_file(
+            buffer,
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            as_attachment=True,
+            download_name=f'hasil_{base_name}.xlsx'
+        )
+    else:
+        response = Response(stream_with_context(iter_csv(hasil)), mimetype='text/csv')
+        response.headers['Content-Disposition'] = f'attachment; filename="hasil_{base_name}.csv"'
+    # Berisi data pribadi siswa, jangan disimpan di cache browser/CDN
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+# Shard hasil statis: satu file JSON per siswa berisi hasil, field API, dan potongan HTML hasil
+# (templates/hasil.html), terenkripsi AES-GCM. Nama file dan kunci diturunkan dari
+# PBKDF2-SHA256(NISN|tanggal lahir, salt): byte pertama menjadi nama, sisanya kunci, jadi shard hanya
+# bisa ditemukan dan dibuka oleh yang tahu pasangan NISN dan tanggal lahirnya. Manifest (di luar
+# direktori publik) mencatat nama dan hash isi (plaintext) tiap shard, jadi ekspor ulang hanya
+# menulis/menghapus shard yang berubah tanpa menghitung ulang PBKDF2 untuk semua siswa.
+RESULT_SHARDS_FORMAT = 2
+
+def result_shard_secret(nisn, tanggal_lahir, salt, iterations):
+    derived = hashlib.pbkdf2_hmac(
+        'sha256', f"{nisn}|{tanggal_lahir}".encode('utf-8'), salt.encode('utf-8'), iterations,
+        dklen=RESULT_SHARDS_NAME_BYTES + RESULT_SHARDS_KEY_BYTES
+    )
+    return derived[:RESULT_SHARDS_NAME_BYTES].hex(), derived[RESULT_SHARDS_NAME_BYTES:]
+
+def encrypt_result_shard(body, name, key):
+    # Nama shard ikut diautentikasi (AAD) agar isi shard tidak bisa dipindah ke nama lain
+    nonce = os.urandom(12)
+    ciphertext = AESGCM(key).encrypt(nonce, body, name.encode('ascii'))
+    return json.dumps({
+        'v': RESULT_SHARDS_FORMAT,
+        'iv': base64.b64encode(nonce).decode('ascii'),
+        'ct': base64.b64encode(ciphertext).decode('ascii'),
+    }, separators=(',', ':')).encode('ascii')
+
+def _result_shard_path(output_dir, name):
+    return os.path.join(output_dir, name[:2], f"{name}.json")
+
+def _load_result_shards_manifest(path, salt_id, iterations):
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    if manifest.get("salt_id") != salt_id or manifest.get("iterations") != iterations \
+            or manifest.get("format") != RESULT_SHARDS_FORMAT:
+        # Salt/iterasi/format berubah: semua shard lama tidak berlaku lagi
+        fresh = {"format": RESULT_SHARDS_FORMAT, "salt_id": salt_id, "iterations": iterations, "entries": {}}
+        return fresh, manifest.get("entries", {})
+    return manifest, {}
+
+def export_result_shards(output_dir=RESULT_SHARDS_DIR, manifest_path=RESULT_SHARDS_MANIFEST,
+                         salt=RESULT_SHARDS_SALT, iterations=RESULT_SHARDS_ITERATIONS):
+    if not salt:
+        raise ValueError("RESULT_SHARDS_SALT belum diisi.")
+    # Data kosong (mis. Drive gagal diakses) tidak boleh menghapus shard yang sudah ada
+    student_index = _build_student_index(load_student_data_from_drive())
+    if not student_index:
+        raise ValueError("Data siswa kosong, tidak ada shard yang dibuat.")
+    salt_id = hashlib.sha256(f"result-shards|{salt}".encode('utf-8')).hexdigest()
+    manifest, obsolete = _load_result_shards_manifest(manifest_path, salt_id, iterations)
+    old_entries = manifest["entries"]
+    entries = {}
+    stats = {"total": 0, "written": 0, "unchanged": 0, "removed": 0, "skipped": 0}
+
+    # Sama dengan cari_kelulusan: baris pertama per NISN, tanggal lahir YYYY-MM-DD
+    for nisn, record in student_index.items():
+        tanggal_lahir = record.get('tanggal_lahir')
+        status = record.get('status_kelulusan')
+        if not tanggal_lahir or not str(status or '').strip():
+            stats["skipped"] += 1  # Tidak punya shard; halaman jatuh ke server yang memberi pesan error
+            continue
+        hasil = 'lulus' if status.strip().upper() == 'LULUS' else 'tidak_lulus'
+        body = json.dumps({
+            'hasil': hasil,
+            'data': {field: _json_value(record.get(field)) for field in API_DATA_FIELDS},
+            'html': render_template('hasil.html', hasil=hasil, data=record),
+        }, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+        # Kunci manifest murah (tanpa PBKDF2) untuk mengenali baris yang isinya tidak berubah.
+        # Kunci enkripsi tidak disimpan, jadi shard yang berubah selalu menghitung ulang PBKDF2.
+        row_key = hashlib.sha256(f"{salt_id}|{nisn}|{tanggal_lahir}".encode('utf-8')).hexdigest()
+        previous = old_entries.get(row_key)
+        digest = hashlib.sha256(body).hexdigest()
+        if previous and previous["sha256"] == digest \
+                and os.path.isfile(_result_shard_path(output_dir, previous["name"])):
+            name = previous["name"]
+            stats["unchanged"] += 1
+        else:
+            name, key = result_shard_secret(nisn, tanggal_lahir, salt, iterations)
+            path = _result_shard_path(output_dir, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(encrypt_result_shard(body, name, key))
+            os.replace(path + '.tmp', path)
+            stats["written"] += 1
+        entries[row_key] = {"name": name, "sha256": digest}
+        stats["total"] += 1
+
+    # Siswa yang dihapus atau tanggal lahirnya dikoreksi: shard lamanya dibuang
+    for row_key, entry in list(old_entries.items()) + list(obsolete.items()):
+        if row_key in entries and entries[row_key]["name"] == entry["name"]:
+            continue
+        try:
+            os.remove(_result_shard_path(output_dir, entry["name"]))
+            stats["removed"] += 1
+        except FileNotFoundError:
+            pass
+
+    manifest["entries"] = entries
+    manifest["updated"] = datetime.now(timezone('Asia/Jakarta')).isoformat()
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return stats
+
+# Bagian statis halaman (jadwal aktif & berikutnya) dalam JSON, dengan ETag dan Cache-Control
+# yang dihitung sekali per perubahan jadwal lalu dipakai ulang
+# (entri timeline disimpan sebagai referensi sehingga perbandingan identitas aman dari reuse id).
+# Entri disimpan sebagai satu tuple (form_aktif, next_schedule, body, etag) agar diganti secara atomik,
+# sama seperti _page_cache: body dan ETag dari jadwal yang berbeda tidak boleh tercampur.
+_jadwal_response_cache = {"entry": None}
+
+def _jadwal_window(entry):
+    if entry is None:
+        return None
+    return {
+        'mulai': entry['mulai_obj'].isoformat(),
+        'berakhir': entry['berakhir_obj'].isoformat(),
+        'keterangan': entry.get('keterangan'),
+        'mulai_timestamp': int(entry['mulai_obj'].timestamp() * 1000),
+        'berakhir_timestamp': int(entry['berakhir_obj'].timestamp() * 1000)
+    }
+
+@app.route('/api/jadwal')
+def api_jadwal():
+    form_aktif, next_schedule = get_schedule_status()
+    entry = _jadwal_response_cache["entry"]
+    if entry is None or entry[0] is not form_aktif or entry[1] is not next_schedule:
+        body = json.dumps({
+            'form_aktif': form_aktif is not None,
+            'jadwal_aktif': _jadwal_window(form_aktif),
+            'jadwal_berikutnya': _jadwal_window(next_schedule)
+        }, separators=(',', ':'))
+        entry = (form_aktif, next_schedule, body, hashlib.sha1(body.encode('utf-8')).hexdigest())
+        _jadwal_response_cache["entry"] = entry
+
+    # Boleh di-cache sampai jadwal berikutnya berubah status (mulai/berakhir), maksimal selama TTL jadwal
+    now = datetime.now(tz)
+    boundaries = [entry[field] for entry in (form_aktif, next_schedule) if entry
+                  for field in ('mulai_obj', 'berakhir_obj') if entry[field] > now]
+    max_age = int(SCHEDULE_CACHE_TTL)
+    if boundaries:
+        max_age = max(0, min(max_age, int((min(boundaries) - now).total_seconds())))
+
+    response = Response(entry[2], mimetype='application/json')
+    response.set_etag(entry[3])
+    response.headers['Cache-Control'] = f'public, max-age={max_age}'
+    return response.make_conditional(request)
+
+# Jadwal dibaca dari penyimpanan lokal (schedule_store.py) yang dibagi semua worker; Gist tetap
+# sumber utama. Cache di memori: TTL, conditional request (ETag), refresh di background, dan fallback
+# ke jadwal terakhir yang valid jika API GitHub gagal. Perubahan dari admin ditulis lokal dulu lalu
+# dikirim ke Gist dalam batch (lihat sync_schedule_to_gist).
+_schedule_cache = {"data": None, "fetched_at": 0.0, "store_version": None}
+_schedule_cache_lock = threading.Lock()
+_schedule_fetch_lock = threading.Lock()
+_schedule_refreshing = threading.Event()
+_schedule_sync_scheduled = threading.Event()
+
+def _gist_headers():
+    return {
+        "Authorization": f"token {GITHUB_TOKEN}",
+        "Accept": "application/vnd.github+json"
+    }
+
+def _parse_gist_schedule(response):
     gist_data = response.json()
     file_content = gist_data["files"].get(GIST_FILENAME, {}).get("content", "[]")
     try:
-        return json.loads(file_content)
+        data = json.loads(file_content)
     except json.JSONDecodeError:
-        return []
+        data = []
+    return data if isinstance(data, list) else []
 
-def save_schedule(schedule_baru):
-    schedule = load_schedule()
-    schedule.append(schedule_baru)
-    updated_content = json.dumps(schedule, indent=4)
+def _load_schedule_from_store():
+    store_version = schedule_store.version()
+    entries = schedule_store.read()["entries"]
+    with _schedule_cache_lock:
+        cached = _schedule_cache["data"]
+        # Objek list hanya diganti jika isinya berubah, sehingga identitasnya bisa dipakai sebagai versi
+        if entries != cached:
+            _schedule_cache["data"] = entries
+        else:
+            entries = cached
+        _schedule_cache["store_version"] = store_version
+    return entries
+
+def _fetch_schedule():
     url = f"https://api.github.com/gists/{GIST_ID}"
-    headers = {
-        "Authorization": f"token {GITHUB_TOKEN}",
-        "Accept": "application/vnd.github+json"
-    }
-    data = {
-        "files": {
-            GIST_FILENAME: {
-                "content": updated_content
-            }
-        }
-    }
-    response = requests.patch(url, headers=headers, json=data)
-    if response.status_code != 200:
-        print("Gagal menyimpan jadwal:", response.status_code)
-        
+    headers = {"Authorization": f"token {GITHUB_TOKEN}"}
+    state = schedule_store.read()
+    if state["base"] is not None and state["etag"]:
+        headers["If-None-Match"] = state["etag"]
+
+    try:
+        metrics.inc('ceklulus_external_calls_total', service='gist', operation='get')
+        with metrics.span('gist_fetch'):
+            response = gist_http.get(url, headers=headers, timeout=GIST_TIMEOUT)
+    except requests.RequestException as e:
+        response = None
+        print("Gagal mengambil jadwal:", e)
+
+    if response is not None and response.status_code == 200:
+        schedule_store.apply_remote(_parse_gist_schedule(response), response.headers.get("ETag"))
+    elif response is None or response.status_code != 304:
+        if response is not None:
+            print("Gagal mengambil jadwal:", response.status_code)
+            metrics.inc('ceklulus_errors_total', stage='gist_fetch', type=f"http_{response.status_code}")
+    # 304: jadwal di Gist tidak berubah. Gagal: pakai jadwal lokal terakhir yang valid dan
+    # tunda percobaan berikutnya sampai TTL habis.
+    with _schedule_cache_lock:
+        _schedule_cache["fetched_at"] = time.monotonic()
+    if schedule_store.read()["pending"]:
+        # Ada perubahan lokal yang belum terkirim (mis. sinkronisasi sebelumnya gagal)
+        request_schedule_sync()
+    return _load_schedule_from_store()
+
+def _refresh_schedule_in_background():
+    if _schedule_refreshing.is_set():
+        return
+    _schedule_refreshing.set()
+
+    def refresh():
+        try:
+            with _schedule_fetch_lock:
+                _fetch_schedule()
+        finally:
+            _schedule_refreshing.clear()
+
+    threading.Thread(target=refresh, daemon=True).start()
+
+# Jadwal yang dikembalikan dipakai bersama antar request, jangan diubah langsung
+def load_schedule(fresh=False):
+    cache = _schedule_cache
+    if cache["data"] is not None and schedule_store.version() != cache["store_version"]:
+        # Worker lain baru saja menulis ke penyimpanan lokal
+        _load_schedule_from_store()
+    if not fresh and cache["data"] is not None:
+        if time.monotonic() - cache["fetched_at"] >= SCHEDULE_CACHE_TTL:
+            # Stale-while-revalidate: kembalikan data lama, refresh di background
+            metrics.inc('ceklulus_schedule_cache_total', result='stale')
+            _refresh_schedule_in_background()
+        else:
+            metrics.inc('ceklulus_schedule_cache_total', result='hit')
+        return cache["data"]
+
+    with _schedule_fetch_lock:
+        # Cek ulang, mungkin thread lain baru saja selesai mengambil jadwal
+        if not fresh and cache["data"] is not None:
+            return cache["data"]
+        if not fresh and schedule_store.read()["base"] is not None:
+            # Penyimpanan lokal sudah berisi jadwal (mis. dari worker lain): pakai dulu, validasi di background
+            metrics.inc('ceklulus_schedule_cache_total', result='stale')
+            data = _load_schedule_from_store()
+            _refresh_schedule_in_background()
+            return data
+        metrics.inc('ceklulus_schedule_cache_total', result='miss')
+        return _fetch_schedule()
+
+# Kirim operasi yang belum tersinkron ke Gist dalam satu PATCH. GitHub tidak mendukung PATCH
+# bersyarat, jadi revisi Gist dicek dulu dengan GET bersyarat: jika Gist berubah dari luar
+# (admin di instance lain), operasi lokal diterapkan ulang di atas isi terbaru, bukan menimpanya.
+def sync_schedule_to_gist():
+    with cache.single_flight("schedule-sync"):
+        state = schedule_store.read()
+        ops = state["pending"]
+        if not ops:
+            return True
+
+        url = f"https://api.github.com/gists/{GIST_ID}"
+        headers = _gist_headers()
+        if state["base"] is not None and state["etag"]:
+            headers["If-None-Match"] = state["etag"]
+        try:
+            metrics.inc('ceklulus_external_calls_total', service='gist', operation='get')
+            with metrics.span('gist_fetch'):
+                response = gist_http.get(url, headers=headers, timeout=GIST_TIMEOUT)
+            if response.status_code == 200:
+                base = schedule_store.ensure_ids(_parse_gist_schedule(response))
+            elif response.status_code == 304:
+                base = state["base"]
+            else:
+                raise RuntimeError(f"GET Gist {response.status_code}")
+
+            content = schedule_store.apply_ops(base, ops)
+            data = {"files": {GIST_FILENAME: {"content": json.dumps(content, indent=4, ensure_ascii=False)}}}
+            metrics.inc('ceklulus_external_calls_total', service='gist', operation='patch')
+            with metrics.span('gist_patch'):
+                response = gist_http.patch(url, headers=_gist_headers(), json=data, timeout=GIST_TIMEOUT)
+            if response.status_code != 200:
+                raise RuntimeError(f"PATCH Gist {response.status_code}")
+        except (requests.RequestException, RuntimeError) as e:
+            print(f"Gagal menyimpan jadwal ke Gist, dicoba lagi dalam {SCHEDULE_SYNC_RETRY:.0f} detik: {e}")
+            metrics.inc('ceklulus_errors_total', stage='gist_sync', type=type(e).__name__)
+            request_schedule_sync(max(SCHEDULE_SYNC_RETRY, 1))
+            return False
+
+        schedule_store.mark_synced({op["op_id"] for op in ops}, content, response.headers.get("ETag"))
+        print(f"{len(ops)} perubahan jadwal disinkronkan ke Gist.")
+    _load_schedule_from_store()
+    return True
+
+# Jadwalkan sinkronisasi; perubahan yang datang selama jeda digabung ke satu PATCH.
+# Jeda 0 = sinkron langsung di request ini (untuk serverless yang membekukan thread background).
+def request_schedule_sync(delay=None):
+    delay = SCHEDULE_SYNC_DELAY if delay is None else delay
+    if delay <= 0:
+        sync_schedule_to_gist()
+        return
+    if _schedule_sync_scheduled.is_set():
+        return
+    _schedule_sync_scheduled.set()
+
+    def run():
+        _schedule_sync_scheduled.clear()
+        sync_schedule_to_gist()
+
+    timer = threading.Timer(delay, run)
+    timer.daemon = True
+    timer.start()
+
+def save_schedule(schedule_baru):
+    if schedule_store.read()["base"] is None:
+        # Belum pernah mengambil isi Gist: ambil dulu agar jadwal lama tidak hilang
+        load_schedule(fresh=True)
+    entry = schedule_store.add(schedule_baru)
+    _load_schedule_from_store()
+    request_schedule_sync()
+    return entry
+
 @app.route("/admin/schedule", methods=["GET", "POST"])
 def atur_schedule():
     if request.method == "POST":
@@ -395,57 +1597,79 @@ def atur_schedule():
         })
         
     schedule = load_schedule()
-    return render_template("schedule.html", schedule=schedule)
-
-@app.route("/admin/schedule/delete/<int:index>", methods=["POST"])
-def hapus_schedule(index):
-    schedule = load_schedule()
-    if 0 <= index < len(schedule):
-        del schedule[index]
-
-        # Simpan ulang ke Gist
-        updated_content = json.dumps(schedule, indent=4)
-        url = f"https://api.github.com/gists/{GIST_ID}"
-        headers = {
-            "Authorization": f"token {GITHUB_TOKEN}",
-            "Accept": "application/vnd.github+json"
-        }
-        data = {
-            "files": {
-                GIST_FILENAME: {
-                    "content": updated_content
-                }
-            }
-        }
-        requests.patch(url, headers=headers, json=data)
+    return render_timed("schedule.html", schedule=schedule)
 
+@app.route("/admin/schedule/delete/<entry_id>", methods=["POST"])
+def hapus_schedule(entry_id):
+    if schedule_store.delete(entry_id):
+        _load_schedule_from_store()
+        request_schedule_sync()
     return redirect(url_for("atur_schedule"))
 
 
 # Definisikan timezone Asia/Jakarta
 tz = timezone('Asia/Jakarta')
 
-def get_schedule_status():
-    now = datetime.now(tz)
+# Timeline jadwal: interval terurut berdasarkan waktu mulai, berisi datetime yang sudah di-parse.
+# Entri dibungkus MappingProxyType agar aman dibaca bersamaan oleh banyak request.
+ScheduleTimeline = namedtuple("ScheduleTimeline", ["source", "starts", "entries", "latest_end"])
+_schedule_timeline = ScheduleTimeline(None, (), (), ())
+
+def build_schedule_timeline(data):
+    entries = []
+    for schedule in data:
+        try:
+            mulai = isoparse(schedule['mulai']).astimezone(tz)
+            berakhir = isoparse(schedule['berakhir']).astimezone(tz)
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"Jadwal tidak valid, dilewati: {schedule} ({e})")
+            continue
+        entry = dict(schedule)
+        entry['mulai_obj'] = mulai
+        entry['berakhir_obj'] = berakhir
+        entries.append(MappingProxyType(entry))
+    entries.sort(key=lambda entry: entry['mulai_obj'])
+
+    # latest_end[i] = indeks entri dengan waktu berakhir paling akhir di antara entries[0..i]
+    latest_end = []
+    best = None
+    for i, entry in enumerate(entries):
+        if best is None or entry['berakhir_obj'] > entries[best]['berakhir_obj']:
+            best = i
+        latest_end.append(best)
 
+    return ScheduleTimeline(
+        data,
+        tuple(entry['mulai_obj'] for entry in entries),
+        tuple(entries),
+        tuple(latest_end)
+    )
+
+def get_schedule_timeline():
+    global _schedule_timeline
     data = load_schedule()
+    timeline = _schedule_timeline
+    if timeline.source is not data:
+        timeline = build_schedule_timeline(data)
+        _schedule_timeline = timeline
+    return timeline
+
+def get_schedule_status():
+    now = datetime.now(tz)
+    with metrics.span('schedule_status'):
+        timeline = get_schedule_timeline()
     form_aktif = None
     next_schedule = None
 
-    for schedule in data:
-        mulai = isoparse(schedule['mulai']).astimezone(tz)
-        berakhir = isoparse(schedule['berakhir']).astimezone(tz)
-
-        if mulai <= now <= berakhir:
-            form_aktif = schedule
-            form_aktif['mulai_obj'] = mulai
-            form_aktif['berakhir_obj'] = berakhir
-            break
-        elif now < mulai:
-            if not next_schedule or mulai < next_schedule['mulai_obj']:
-                next_schedule = schedule
-                next_schedule['mulai_obj'] = mulai
-                next_schedule['berakhir_obj'] = berakhir
+    # Jumlah jadwal yang sudah mulai (mulai <= now)
+    started = bisect_right(timeline.starts, now)
+    if started:
+        # Jadwal aktif jika ada yang sudah mulai dan belum berakhir
+        candidate = timeline.entries[timeline.latest_end[started - 1]]
+        if now <= candidate['berakhir_obj']:
+            form_aktif = candidate
+    if started < len(timeline.entries):
+        next_schedule = timeline.entries[started]
 
     return form_aktif, next_schedule
 
@@ -468,9 +1692,7 @@ def format_datetime(value):
 # Fungsi untuk memulai cache
 def get_all_files(service, folder_id):
     try:
-        query = f"'{folder_id}' in parents and trashed = false"
-        results = service.files().list(q=query, fields="files(id, name, mimeType)").execute()
-        items = results.get('files', [])
+        items = list_folder_files(service, folder_id)
         if not items:
             print("No files found.")
             return []
@@ -479,28 +1701,375 @@ def get_all_files(service, folder_id):
         print("Error getting files:", e)
         return []
 
-def warm_up_cache_for_files(folder_id):
+def file_md5(path):
+    h = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+# Manifest warm-up: md5 file yang sudah selesai di-cache beserta ukuran & mtime lokalnya,
+# sehingga warm-up yang terputus bisa dilanjutkan tanpa menghitung ulang md5 semua file
+def _load_warmup_manifest():
+    try:
+        with open(WARMUP_MANIFEST_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_warmup_manifest(manifest):
+    tmp_path = WARMUP_MANIFEST_FILE + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, WARMUP_MANIFEST_FILE)
+
+# Cek apakah file cache lokal sama dengan metadata di Drive (ukuran dan md5)
+def _cached_file_matches(path, item, manifest_entry):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    if 'size' in item and stat.st_size != int(item['size']):
+        return False
+    md5 = item.get('md5Checksum')
+    if not md5:
+        return True  # Drive tidak memberi md5, ukuran yang sama dianggap cukup
+    if manifest_entry and manifest_entry.get('md5') == md5 \
+            and manifest_entry.get('size') == stat.st_size \
+            and manifest_entry.get('mtime_ns') == stat.st_mtime_ns:
+        return True
+    return file_md5(path) == md5
+
+def _warm_up_file(item, manifest_entry):
+    file_name = item['name']
+    local_cache_path = cache.path(file_name)
+    if not local_cache_path or not _is_cacheable(file_name):
+        return 'dilewati', 0
+    if _cached_file_matches(local_cache_path, item, manifest_entry):
+        return 'sudah_ada', 0
+
+    # Pakai ID dari listing secara langsung, tanpa get_file_id per file
+    service = authenticate_google_drive()
+    path = fill_drive_cache(service, item['id'], file_name, drive_version(item))
+    return 'diunduh', os.path.getsize(path)
+
+def warm_up_cache_for_files(folder_id, workers=None):
     service = authenticate_google_drive()
     files = get_all_files(service, folder_id)
+    workers = workers or WARMUP_WORKERS
 
-    for file in files:
-        file_name = file['name']
-        print(f"Memulai pre-caching file: {file_name}")
-        file_stream = download_file_from_drive(file_name, folder_id)
-        if file_stream:
-            print(f"File {file_name} berhasil di-cache.")
-        else:
-            print(f"File {file_name} gagal diunduh dan tidak bisa di-cache.")
+    manifest = _load_warmup_manifest()
+    manifest_lock = threading.Lock()
+    counts = {'diunduh': 0, 'sudah_ada': 0, 'dilewati': 0, 'gagal': 0}
+    total_bytes = 0
+    started = time.monotonic()
+    last_report = started
+
+    print(f"Memulai pre-caching {len(files)} file dengan {workers} worker...")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_warm_up_file, item, manifest.get(item['name'])): item
+            for item in files
+        }
+        for done_count, future in enumerate(as_completed(futures), start=1):
+            item = futures[future]
+            file_name = item['name']
+            try:
+                status, downloaded = future.result()
+            except Exception as e:
+                print(f"File {file_name} gagal diunduh dan tidak bisa di-cache: {e}")
+                status, downloaded = 'gagal', 0
+            counts[status] += 1
+            total_bytes += downloaded
+
+            # File bisa saja sudah dievict lagi jika cache lebih kecil dari isi folder
+            cached_path = cache.path(file_name) if status in ('diunduh', 'sudah_ada') else None
+            if cached_path and os.path.isfile(cached_path):
+                stat = os.stat(cached_path)
+                with manifest_lock:
+                    manifest[file_name] = {
+                        'md5': item.get('md5Checksum'),
+                        'size': stat.st_size,
+                        'mtime_ns': stat.st_mtime_ns
+                    }
+                    # Simpan manifest berkala agar progres tidak hilang jika proses terhenti
+                    if done_count % WARMUP_MANIFEST_EVERY == 0:
+                        _save_warmup_manifest(manifest)
+
+            now = time.monotonic()
+            if now - last_report >= WARMUP_REPORT_INTERVAL or done_count == len(files):
+                elapsed = max(now - started, 1e-9)
+                print(f"[warm-up] {done_count}/{len(files)} file, "
+                      f"{total_bytes / 1048576:.1f} MB, {done_count / elapsed:.1f} file/s, "
+                      f"{total_bytes / 1048576 / elapsed:.2f} MB/s")
+                last_report = now
+
+    _save_warmup_manifest(manifest)
+    elapsed = time.monotonic() - started
+    report = dict(counts, total=len(files), bytes=total_bytes, detik=round(elapsed, 2))
+    print(f"Pre-caching selesai: {report}")
+    return report
+
+# Feed perubahan Drive: satu panggilan changes.list per interval (dibagi semua worker lewat file state)
+# menggantikan pengecekan versi per file. File yang berubah di FOLDER_ID_SISWA/FOLDER_ID_SURAT dan
+# sudah ada di cache diunduh ulang lalu ditukar secara atomik; file yang dihapus dibuang dari cache.
+# State: page token, waktu polling terakhir, dan waktu perubahan terakhir per folder (untuk
+# membatalkan listing folder di semua worker).
+DRIVE_CHANGE_FIELDS = f"nextPageToken, newStartPageToken, changes(fileId, removed, file({DRIVE_FILE_FIELDS}, parents, trashed))"
+_drive_changes_state = {"key": None, "state": None}
+_drive_changes_lock = threading.Lock()
+_drive_watcher_started = threading.Event()
+
+def read_drive_changes_state():
+    try:
+        stat = os.stat(DRIVE_CHANGES_STATE_FILE)
+        key = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        key = None
+    cached = _drive_changes_state
+    if cached["state"] is not None and cached["key"] == key:
+        return cached["state"]
+    state = {"page_token": None, "polled_at": 0.0, "folders": {}}
+    if key is not None:
+        try:
+            with open(DRIVE_CHANGES_STATE_FILE) as f:
+                state.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+    cached.update(key=key, state=state)
+    return state
+
+def _write_drive_changes_state(state):
+    tmp_path = DRIVE_CHANGES_STATE_FILE + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, DRIVE_CHANGES_STATE_FILE)
+
+def drive_changes_healthy(state=None):
+    # Feed dianggap aktif jika polling terakhir berhasil dalam tiga interval
+    if not DRIVE_CHANGES_INTERVAL:
+        return False
+    state = read_drive_changes_state() if state is None else state
+    return time.time() - state["polled_at"] < 3 * DRIVE_CHANGES_INTERVAL
+
+def _cached_name_for_file_id(file_id):
+    for _, listing, _ in list(_folder_listings.values()):
+        for name, item in listing.items():
+            if item.get('id') == file_id:
+                return name
+    return None
+
+def _refresh_cached_file(service, metadata):
+    name = metadata['name']
+    cache_file_path = cache.path(name) if _is_cacheable(name) else None
+    version = drive_version(metadata)
+    if not cache_file_path or not os.path.isfile(cache_file_path) \
+            or cache.get_version(name, fresh=True) == version:
+        return False
+    # fill_drive_cache menulis ke file sementara lalu rename, pembaca tidak melihat file setengah jadi
+    fill_drive_cache(service, metadata['id'], name, version)
+    print(f"File {name} berubah di Drive, cache diperbarui.")
+    return True
+
+def poll_drive_changes(force=False):
+    watched = {folder_id for folder_id in (FOLDER_ID_SISWA, FOLDER_ID_SURAT) if folder_id}
+    with cache.single_flight("drive-changes"):
+        state = dict(read_drive_changes_state())
+        if not force and time.time() - state["polled_at"] < DRIVE_CHANGES_INTERVAL:
+            return None  # Worker lain baru saja polling
+        service = authenticate_google_drive()
+        if not state["page_token"]:
+            # Polling pertama: mulai dari sekarang; isi cache yang ada divalidasi lewat listing seperti biasa
+            metrics.inc('ceklulus_external_calls_total', service='drive', operation='changes.getStartPageToken')
+            state["page_token"] = service.changes().getStartPageToken(supportsAllDrives=True).execute()["startPageToken"]
+            state["polled_at"] = time.time()
+            _write_drive_changes_state(state)
+            return {"changes": 0, "refreshed": [], "removed": []}
+
+        changes = []
+        page_token = state["page_token"]
+        while page_token:
+            metrics.inc('ceklulus_external_calls_total', service='drive', operation='changes.list')
+            with metrics.span('drive_changes'):
+                response = service.changes().list(
+                    pageToken=page_token,
+                    fields=DRIVE_CHANGE_FIELDS,
+                    pageSize=1000,
+                    includeRemoved=True,
+                    supportsAllDrives=True,
+                    includeItemsFromAllDrives=True
+                ).execute()
+            changes.extend(response.get("changes", []))
+            page_token = response.get("nextPageToken")
+            if response.get("newStartPageToken"):
+                state["page_token"] = response["newStartPageToken"]
+
+        # Hanya perubahan di folder yang dipantau (atau file yang sebelumnya ada di listing-nya)
+        relevant = []
+        folders = dict(state["folders"])
+        now = time.time()
+        for change in changes:
+            metadata = change.get("file") or {}
+            previous_name = _cached_name_for_file_id(change.get("fileId"))
+            parents = watched.intersection(metadata.get("parents", ()))
+            if not parents and previous_name is None:
+                continue
+            for folder_id in parents or watched:
+                folders[folder_id] = now
+            relevant.append((change, metadata, previous_name))
+        state["folders"] = folders
+        state["polled_at"] = now
+        # Tandai folder berubah sebelum file diunduh ulang, agar worker lain segera membaca ulang listing
+        _write_drive_changes_state(state)
+
+        refreshed, removed = [], []
+        for change, metadata, previous_name in relevant:
+            gone = change.get("removed") or metadata.get("trashed") \
+                or not watched.intersection(metadata.get("parents", ()))
+            if previous_name and (gone or previous_name != metadata.get("name")):
+                # File dihapus, dipindah, atau diganti nama: salinan lama di cache dibuang
+                if os.path.isfile(cache.path(previous_name) or ''):
+                    cache.remove(previous_name)
+                    removed.append(previous_name)
+                    metrics.inc('ceklulus_drive_changes_total', action='removed')
+            if not gone:
+                try:
+                    if _refresh_cached_file(service, metadata):
+                        refreshed.append(metadata['name'])
+                        metrics.inc('ceklulus_drive_changes_total', action='refreshed')
+                except Exception as e:
+                    print(f"Gagal memperbarui cache {metadata.get('name')}: {e}")
+        return {"changes": len(changes), "refreshed": refreshed, "removed": removed}
+
+def _drive_watcher_loop():
+    while True:
+        try:
+            poll_drive_changes()
+        except Exception as e:
+            print(f"Polling perubahan Drive gagal: {e}")
+            metrics.inc('ceklulus_errors_total', stage='drive_changes', type=type(e).__name__)
+        finally:
+            release_google_drive()
+        time.sleep(DRIVE_CHANGES_INTERVAL)
+
+# Thread pemantau dimulai per proses saat request pertama (setelah fork worker gunicorn)
+@app.before_request
+def _mulai_pemantau_drive():
+    if DRIVE_CHANGES_INTERVAL and not _drive_watcher_started.is_set():
+        with _drive_changes_lock:
+            if not _drive_watcher_started.is_set():
+                _drive_watcher_started.set()
+                threading.Thread(target=_drive_watcher_loop, daemon=True, name="drive-changes").start()
 
 # Memanggil fungsi pre-caching langsung sebelum aplikasi dimulai
 def pre_cache_student_data():
     load_student_data_from_drive()
+
+# Hook warm-up: semua biaya yang biasanya dibayar request pertama (import, klien Drive, indeks siswa)
+def preload_runtime(student_index=True):
+    started = time.perf_counter()
+    lazy.preload(PRELOAD_MODULES)
+    if CREDENTIALS_JSON:
+        try:
+            authenticate_google_drive()
+        finally:
+            release_google_drive()
+    if student_index:
+        get_student_index()
+    print(f"Warm-up selesai dalam {time.perf_counter() - started:.2f} detik.")
+
+def _preload_in_background():
+    try:
+        preload_runtime()
+    except Exception as e:
+        print(f"Warm-up gagal: {e}")
     
 def pre_cache_files():
     folder_id = FOLDER_ID_SURAT  # Gunakan folder ID yang sesuai
     pre_cache_student_data()
     warm_up_cache_for_files(folder_id)
 
+# Perintah CLI: flask warm-up [--workers N] [--folder-id ID]
+@app.cli.command("warm-up")
+@click.option("--workers", type=int, default=None, help="Jumlah unduhan paralel (default: WARMUP_WORKERS).")
+@click.option("--folder-id", default=None, help="Folder Drive yang di-cache (default: FOLDER_ID_SURAT).")
+@click.option("--skip-student-data", is_flag=True, help="Jangan muat data siswa terlebih dahulu.")
+def warm_up_command(workers, folder_id, skip_student_data):
+    if not skip_student_data:
+        pre_cache_student_data()
+    report = warm_up_cache_for_files(folder_id or FOLDER_ID_SURAT, workers)
+    click.echo(json.dumps(report))
+
+# Perintah CLI: flask cache-stats
+@app.cli.command("cache-stats")
+def cache_stats_command():
+    click.echo(json.dumps(cache.stats(), indent=2))
+
+# Perintah CLI: flask poll-drive-changes (mis. dari cron jika thread pemantau tidak berjalan)
+@app.cli.command("poll-drive-changes")
+def poll_drive_changes_command():
+    click.echo(json.dumps(poll_drive_changes(force=True)))
+
+# Perintah CLI: flask build-snapshot [--output DIR]
+@app.cli.command("build-snapshot")
+@click.option("--output", default=None, help="Direktori tujuan snapshot (default: CACHE_DIR).")
+def build_snapshot_command(output):
+    df = load_student_data_from_drive()
+    if df.empty:
+        raise click.ClickException("Data siswa kosong, snapshot tidak dibuat.")
+    cached_file_path = os.path.join(CACHE_DIR, FILE_NAME_SISWA)
+    path = write_student_snapshot(df, file_sha256(cached_file_path), output)
+    click.echo(f"Snapshot siap: {path}")
+
+# Perintah CLI: flask export-hasil [--output DIR] (butuh RESULT_SHARDS_SALT)
+@app.cli.command("export-hasil")
+@click.option("--output", default=RESULT_SHARDS_DIR, show_default=True, help="Direktori shard yang dipublikasikan.")
+@click.option("--manifest", default=RESULT_SHARDS_MANIFEST, show_default=True,
+              help="Manifest untuk ekspor ulang inkremental (jangan ikut dipublikasikan).")
+def export_hasil_command(output, manifest):
+    try:
+        stats = export_result_shards(output, manifest)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo(json.dumps({'output': output, **stats}))
+
+# Perintah CLI: flask import-profile [--top N] [--budget-ms MS] [--json]
+@app.cli.command("import-profile")
+@click.option("--top", type=int, default=15, show_default=True, help="Jumlah modul teratas yang ditampilkan.")
+@click.option("--budget-ms", type=float, default=None, help="Gagal jika total waktu import melebihi batas ini.")
+@click.option("--json", "as_json", is_flag=True, help="Keluarkan ringkasan sebagai JSON.")
+def import_profile_command(top, budget_ms, as_json):
+    import import_profile  # Hanya dibutuhkan perintah ini, tidak ikut dimuat saat import app
+    try:
+        summary = import_profile.profile("app", top)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    click.echo(json.dumps(summary) if as_json else import_profile.format_report(summary))
+    if budget_ms is not None and summary["total_ms"] > budget_ms:
+        raise click.ClickException(f"Waktu import {summary['total_ms']:.1f} ms melebihi batas {budget_ms:.0f} ms.")
+
+# Perintah CLI: flask cek-massal INPUT [--output FILE]
+@app.cli.command("cek-massal")
+@click.argument("input_file", type=click.Path(exists=True, dir_okay=False))
+@click.option("--output", default=None, help="File hasil .csv atau .xlsx (default: hasil_<nama input>.csv).")
+def cek_massal_command(input_file, output):
+    try:
+        df_input = read_bulk_input(input_file, input_file)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    hasil = cek_kelulusan_massal(df_input)
+    if output is None:
+        output = f"hasil_{os.path.splitext(os.path.basename(input_file))[0]}.csv"
+    if output.lower().endswith('.xlsx'):
+        hasil.to_excel(output, index=False)
+    else:
+        hasil.to_csv(output, index=False)
+    summary = hasil['status'].value_counts().to_dict()
+    click.echo(json.dumps({'output': output, 'rows': len(hasil), **summary}))
+
+if PRELOAD_ON_START:
+    threading.Thread(target=_preload_in_background, daemon=True, name="preload").start()
+
 if __name__ == '__main__':
     #pre_cache_files() # Pre-cache files saat aplikasi dimulai
     app.run(debug=True)
\ No newline at end of file
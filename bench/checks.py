@@ -0,0 +1,208 @@
+# Pemeriksaan perilaku offline (tanpa Drive/Gist sungguhan) untuk bagian yang mudah rusak diam-diam
+# saat dioptimalkan: replay operasi jadwal di atas Gist yang berubah, jendela jadwal yang tumpang
+# tindih, eviksi cache yang menghormati file pinned, dan pengisian ulang token bucket.
+# Keluar dengan status 1 jika ada pemeriksaan yang gagal, jadi bisa dipakai di CI.
+#
+# Pemakaian:
+#   python -m bench.checks
+#   python -m bench.checks --check timeline-overlap --check bucket-refill
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from bench import fakes
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def check_schedule_op_replay(app_module, gist):
+    # Admin menambah & menghapus jadwal secara lokal, lalu instance lain mengubah Gist sebelum
+    # sinkronisasi: operasi lokal harus diterapkan ulang di atas isi Gist terbaru tanpa menimpanya
+    store = app_module.schedule_store
+    app_module.load_schedule(fresh=True)
+    base = store.read()["base"]
+    assert [entry["keterangan"] for entry in base] == ["lama"], base
+
+    added = store.add({"mulai": "2030-02-01T07:00:00+07:00", "berakhir": "2030-02-02T07:00:00+07:00",
+                       "keterangan": "lokal", "waktu_input": "x"})
+    assert store.delete(base[0]["id"])
+    remote = json.loads(gist.content) + [{"mulai": "2030-03-01T07:00:00+07:00", "berakhir": "2030-03-02T07:00:00+07:00",
+                                          "keterangan": "instance lain", "waktu_input": "x"}]
+    gist._set_content(json.dumps(remote, indent=4))
+
+    assert app_module.sync_schedule_to_gist()
+    content = json.loads(gist.content)
+    assert sorted(entry["keterangan"] for entry in content) == ["instance lain", "lokal"], content
+    assert any(entry["id"] == added["id"] for entry in content), content
+    state = store.read()
+    assert state["pending"] == [], state["pending"]
+    assert state["entries"] == content, (state["entries"], content)
+    # Sinkronisasi kedua tanpa perubahan tidak boleh menulis ke Gist lagi
+    patches = gist.calls["patch"]
+    assert app_module.sync_schedule_to_gist()
+    assert gist.calls["patch"] == patches, gist.calls
+
+
+def check_timeline_overlap(app_module, gist):
+    tz = app_module.tz
+    now = datetime.now(tz)
+    window = lambda start, end, label: {"mulai": (now + start).isoformat(), "berakhir": (now + end).isoformat(),
+                                        "keterangan": label, "waktu_input": "x"}
+    data = [
+        window(timedelta(days=3), timedelta(days=4), "berikutnya"),
+        window(timedelta(hours=-1), timedelta(hours=1), "di dalam"),
+        window(timedelta(days=-1), timedelta(days=2), "panjang"),
+        window(timedelta(hours=-2), timedelta(hours=-1, minutes=30), "sudah lewat"),
+        {"mulai": "bukan tanggal", "berakhir": "x", "keterangan": "rusak"},
+    ]
+    timeline = app_module.build_schedule_timeline(data)
+    assert len(timeline.entries) == 4, timeline.entries
+    assert list(timeline.starts) == sorted(timeline.starts)
+
+    def status_at(moment):
+        # get_schedule_status dengan timeline di atas dan jam yang dibekukan di `moment`
+        original_timeline, original_datetime = app_module.get_schedule_timeline, app_module.datetime
+        app_module.get_schedule_timeline = lambda: timeline
+        app_module.datetime = type("FrozenDatetime", (datetime,), {"now": classmethod(lambda cls, tz=None: moment)})
+        try:
+            return app_module.get_schedule_status()
+        finally:
+            app_module.get_schedule_timeline, app_module.datetime = original_timeline, original_datetime
+
+    label = lambda entry: entry["keterangan"] if entry else None
+    # Jendela pendek yang mulai belakangan tidak boleh menutupi jendela panjang yang masih berjalan
+    aktif, berikutnya = status_at(now + timedelta(hours=1, minutes=30))
+    assert (label(aktif), label(berikutnya)) == ("panjang", "berikutnya"), (label(aktif), label(berikutnya))
+    aktif, berikutnya = status_at(now)
+    assert (label(aktif), label(berikutnya)) == ("panjang", "berikutnya"), (label(aktif), label(berikutnya))
+    aktif, berikutnya = status_at(now + timedelta(days=2, hours=1))
+    assert (label(aktif), label(berikutnya)) == (None, "berikutnya"), (label(aktif), label(berikutnya))
+    aktif, berikutnya = status_at(now + timedelta(days=5))
+    assert (aktif, berikutnya) == (None, None), (aktif, berikutnya)
+
+
+def check_cache_pinned_eviction(app_module, gist):
+    from cache_manager import CacheManager
+
+    root = tempfile.mkdtemp(prefix="ceklulus-check-cache-")
+    try:
+        cache = CacheManager(root, max_entries=3, pinned=("data_siswa.xlsx",))
+
+        def write(name):
+            with cache.open_write(name) as fh:
+                fh.write(b"x" * 10)
+            time.sleep(0.01)  # Urutan akses tegas agar LRU tidak bergantung pada resolusi jam
+
+        # data_siswa.xlsx paling lama tidak dipakai, tetapi pinned sehingga tidak pernah dievict
+        for name in ("data_siswa.xlsx", "a.pdf", "b.pdf"):
+            write(name)
+        assert cache.get("a.pdf")  # a dipakai lagi, jadi b yang paling lama tidak dipakai
+        time.sleep(0.01)
+        write("c.pdf")
+        remaining = sorted(name for name in os.listdir(root) if not name.startswith("."))
+        assert remaining == ["a.pdf", "c.pdf", "data_siswa.xlsx"], remaining
+        write("d.pdf")
+        remaining = sorted(name for name in os.listdir(root) if not name.startswith("."))
+        assert remaining == ["c.pdf", "d.pdf", "data_siswa.xlsx"], remaining
+        assert cache.stats()["evictions"] == 2, cache.stats()
+
+        # Batas ukuran yang lebih kecil dari file pinned tetap tidak menghapusnya
+        cache.max_entries = 0
+        cache.max_bytes = 5
+        evicted = cache.enforce_limits()
+        assert "data_siswa.xlsx" not in evicted and os.path.exists(os.path.join(root, "data_siswa.xlsx")), evicted
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def check_bucket_refill(app_module, gist):
+    import admission
+
+    root = tempfile.mkdtemp(prefix="ceklulus-check-bucket-")
+    try:
+        stores = [admission.MemoryBucketStore(), admission.SqliteBucketStore(os.path.join(root, "buckets.sqlite3"))]
+        for store in stores:
+            burst, rate = admission.parse_rate("2/0.2")  # 2 token, terisi 10 token per detik
+            assert store.take("k", burst, rate)[0] and store.take("k", burst, rate)[0], type(store).__name__
+            allowed, retry_after = store.take("k", burst, rate)
+            assert not allowed and 0 < retry_after <= 0.1, (type(store).__name__, retry_after)
+            assert store.take("lain", burst, rate)[0], type(store).__name__  # Bucket per kunci
+            time.sleep(retry_after + 0.05)
+            assert store.take("k", burst, rate)[0], type(store).__name__
+            # Jeda panjang tidak mengisi lebih dari kapasitas
+            time.sleep(0.5)
+            results = [store.take("k", burst, rate)[0] for _ in range(3)]
+            assert results == [True, True, False], (type(store).__name__, results)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+CHECKS = {
+    "schedule-op-replay": check_schedule_op_replay,
+    "timeline-overlap": check_timeline_overlap,
+    "cache-pinned-eviction": check_cache_pinned_eviction,
+    "bucket-refill": check_bucket_refill,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pemeriksaan perilaku offline app.py dengan Drive & Gist lokal.")
+    parser.add_argument("--check", action="append", choices=tuple(CHECKS),
+                        help="Pemeriksaan yang dijalankan (boleh diulang, default: semua).")
+    args = parser.parse_args()
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+    # Sama dengan bench.run: app.py membaca environment dan membuat cache relatif ke direktori kerja
+    workdir = tempfile.mkdtemp(prefix="ceklulus-check-")
+    os.chdir(workdir)
+    os.environ.setdefault("CREDENTIALS_JSON", "{}")
+    os.environ["FOLDER_ID_SISWA"] = "check-folder-siswa"
+    os.environ["FOLDER_ID_SURAT"] = "check-folder-surat"
+    os.environ["GIST_ID"] = "check"
+    os.environ["SCHEDULE_SYNC_DELAY"] = "0"
+    os.environ["DRIVE_CHANGES_INTERVAL"] = "0"
+    os.environ["PRELOAD_ON_START"] = "0"
+    os.environ.pop("VERCEL", None)
+
+    import app as app_module
+
+    gist = fakes.FakeGist(app_module.GIST_FILENAME, [{
+        "mulai": "2030-01-01T07:00:00+07:00", "berakhir": "2030-01-02T07:00:00+07:00",
+        "keterangan": "lama", "waktu_input": "x",
+    }])
+    fakes.install(app_module, fakes.FakeDrive(), gist)
+
+    failed = []
+    real_stdout = sys.stdout
+    try:
+        for name in args.check or list(CHECKS):
+            # Log print() dari app.py ke stderr agar ringkasan tetap terbaca
+            sys.stdout = sys.stderr
+            try:
+                CHECKS[name](app_module, gist)
+            except Exception:
+                failed.append(name)
+                sys.stdout = real_stdout
+                print(f"GAGAL {name}")
+                traceback.print_exc()
+            else:
+                sys.stdout = real_stdout
+                print(f"OK    {name}")
+    finally:
+        sys.stdout = real_stdout
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if failed:
+        print(f"{len(failed)} pemeriksaan gagal: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
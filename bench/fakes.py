@@ -0,0 +1,198 @@
+# Pengganti lokal untuk Google Drive dan GitHub Gist agar semua jalur app.py bisa diukur tanpa jaringan.
+# Latensi jaringan bisa disimulasikan lewat parameter latency (detik).
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime, timezone
+
+import requests
+
+
+# ---- Google Drive ----
+
+class _Execute:
+    def __init__(self, fn):
+        self._fn = fn
+
+    def execute(self):
+        return self._fn()
+
+
+class _FakeFiles:
+    def __init__(self, drive):
+        self._drive = drive
+
+    def list(self, q=None, fields=None, pageSize=1000, pageToken=None, **kwargs):
+        return _Execute(lambda: self._drive.list_files(q, pageSize, pageToken))
+
+    def get_media(self, fileId=None, **kwargs):
+        return (self._drive, fileId)
+
+
+class _FakeChanges:
+    def __init__(self, drive):
+        self._drive = drive
+
+    def getStartPageToken(self, **kwargs):
+        return _Execute(lambda: {'startPageToken': str(len(self._drive.changes))})
+
+    def list(self, pageToken=None, pageSize=1000, **kwargs):
+        return _Execute(lambda: self._drive.list_changes(pageToken, pageSize))
+
+
+class FakeDriveService:
+    def __init__(self, drive):
+        self._drive = drive
+
+    def files(self):
+        return _FakeFiles(self._drive)
+
+    def changes(self):
+        return _FakeChanges(self._drive)
+
+
+# Isi Drive palsu: folder_id -> {nama_file: bytes}
+class FakeDrive:
+    def __init__(self, latency=0.0, page_size=1000):
+        self.latency = latency
+        self.page_size = page_size
+        self.folders = {}
+        self.files = {}  # file_id -> (folder_id, nama, bytes, modifiedTime)
+        self.changes = []  # Feed perubahan (changes.list): (file_id, removed)
+        self.calls = {'list': 0, 'media': 0, 'auth': 0, 'changes': 0}
+        self._lock = threading.Lock()
+
+    def put(self, folder_id, name, content):
+        file_id = hashlib.sha1(f"{folder_id}/{name}".encode()).hexdigest()
+        modified = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            self.folders.setdefault(folder_id, {})[name] = file_id
+            self.files[file_id] = (folder_id, name, content, modified)
+            self.changes.append((file_id, False))
+        return file_id
+
+    def delete(self, folder_id, name):
+        with self._lock:
+            file_id = self.folders.get(folder_id, {}).pop(name)
+            del self.files[file_id]
+            self.changes.append((file_id, True))
+
+    def list_changes(self, page_token, page_size):
+        self.calls['changes'] += 1
+        time.sleep(self.latency)
+        start = int(page_token or 0)
+        page = self.changes[start:start + page_size]
+        result = {'changes': []}
+        for file_id, removed in page:
+            change = {'fileId': file_id, 'removed': removed or file_id not in self.files}
+            if not change['removed']:
+                change['file'] = dict(self._metadata(file_id), parents=[self.files[file_id][0]], trashed=False)
+            result['changes'].append(change)
+        if start + page_size < len(self.changes):
+            result['nextPageToken'] = str(start + page_size)
+        else:
+            result['newStartPageToken'] = str(len(self.changes))
+        return result
+
+    def _metadata(self, file_id):
+        folder_id, name, content, modified = self.files[file_id]
+        return {
+            'id': file_id,
+            'name': name,
+            'mimeType': 'application/octet-stream',
+            'size': str(len(content)),
+            'md5Checksum': hashlib.md5(content).hexdigest(),
+            'modifiedTime': modified,
+        }
+
+    def list_files(self, q, page_size, page_token):
+        self.calls['list'] += 1
+        time.sleep(self.latency)
+        # Query app.py berbentuk "[name = '...' and ]'<folder>' in parents and trashed = false"
+        folder_id = q.split("'")[-2]
+        ids = list(self.folders.get(folder_id, {}).values())
+        start = int(page_token or 0)
+        page_size = min(page_size or self.page_size, self.page_size)
+        result = {'files': [self._metadata(file_id) for file_id in ids[start:start + page_size]]}
+        if start + page_size < len(ids):
+            result['nextPageToken'] = str(start + page_size)
+        return result
+
+    def authenticate(self):
+        self.calls['auth'] += 1
+        return FakeDriveService(self)
+
+
+# Pengganti MediaIoBaseDownload: mengirim isi file ke fd per chunk
+class FakeMediaDownload:
+    def __init__(self, fd, request, chunksize=100 * 1024 * 1024):
+        drive, file_id = request
+        self._fd = fd
+        self._content = drive.files[file_id][2]
+        self._chunksize = chunksize
+        self._pos = 0
+        self._latency = drive.latency
+        drive.calls['media'] += 1
+
+    def next_chunk(self):
+        time.sleep(self._latency)
+        chunk = self._content[self._pos:self._pos + self._chunksize]
+        self._fd.write(chunk)
+        self._pos += len(chunk)
+        return None, self._pos >= len(self._content)
+
+
+# ---- GitHub Gist ----
+
+class _FakeResponse:
+    def __init__(self, status_code, data=None, headers=None):
+        self.status_code = status_code
+        self._data = data
+        self.headers = headers or {}
+
+    def json(self):
+        return self._data
+
+
+# Pengganti klien HTTP Gist (app.gist_http) yang dipakai load_schedule/save_schedule
+class FakeGist:
+    RequestException = requests.RequestException
+    ConnectionError = requests.ConnectionError
+    Timeout = requests.Timeout
+
+    def __init__(self, filename, schedule=None, latency=0.0):
+        self.filename = filename
+        self.latency = latency
+        self.calls = {'get': 0, 'get_304': 0, 'patch': 0}
+        self._lock = threading.Lock()
+        self._set_content(json.dumps(schedule or [], indent=4))
+
+    def _set_content(self, content):
+        self.content = content
+        self.etag = '"%s"' % hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def get(self, url, headers=None, timeout=None, **kwargs):
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls['get'] += 1
+            if headers and headers.get('If-None-Match') == self.etag:
+                self.calls['get_304'] += 1
+                return _FakeResponse(304, headers={'ETag': self.etag})
+            data = {'files': {self.filename: {'content': self.content}}}
+            return _FakeResponse(200, data, {'ETag': self.etag})
+
+    def patch(self, url, headers=None, json=None, timeout=None, **kwargs):
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls['patch'] += 1
+            self._set_content(json['files'][self.filename]['content'])
+            data = {'files': {self.filename: {'content': self.content}}}
+            return _FakeResponse(200, data, {'ETag': self.etag})
+
+
+# Pasang pengganti Drive & Gist ke modul app yang sudah di-import
+def install(app_module, drive, gist):
+    app_module.authenticate_google_drive = drive.authenticate
+    app_module.MediaIoBaseDownload = FakeMediaDownload
+    app_module.gist_http = gist
@@ -0,0 +1,52 @@
+# Generator data siswa sintetis untuk benchmark (1k sampai 1M siswa).
+# Pemakaian: python -m bench.generate_data --students 100000 --output /tmp/data_siswa.xlsx
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+NAMA_DEPAN = ['Ahmad', 'Siti', 'Muhammad', 'Nur', 'Dewi', 'Rizki', 'Putri', 'Fajar', 'Aisyah', 'Budi']
+NAMA_BELAKANG = ['Hidayat', 'Rahmawati', 'Saputra', 'Lestari', 'Pratama', 'Wulandari', 'Nugroho', 'Fauziah']
+
+
+# Buat DataFrame dengan kolom yang sama seperti data_siswa.xlsx asli
+def generate_students(n, seed=0, lulus_ratio=0.95):
+    rng = np.random.default_rng(seed)
+    nisn = (np.arange(n, dtype=np.int64) + 10_000_000)
+    rng.shuffle(nisn)
+    tanggal_lahir = pd.Timestamp('2006-01-01') + pd.to_timedelta(rng.integers(0, 3 * 365, n), unit='D')
+    lulus = rng.random(n) < lulus_ratio
+    nama = [
+        f"{NAMA_DEPAN[i % len(NAMA_DEPAN)]} {NAMA_BELAKANG[(i // len(NAMA_DEPAN)) % len(NAMA_BELAKANG)]}"
+        for i in rng.integers(0, 10_000, n)
+    ]
+    return pd.DataFrame({
+        'nisn': nisn,
+        'nama': nama,
+        'tanggal_lahir': tanggal_lahir,
+        'status_kelulusan': np.where(lulus, 'LULUS', 'TIDAK LULUS'),
+        'file_pdf': [f"{value}.pdf" for value in nisn],
+        'status_skl': np.where(lulus & (rng.random(n) < 0.9), 'LULUS', 'DITAHAN'),
+    })
+
+
+def write_xlsx(df, path):
+    df.to_excel(path, index=False, engine='openpyxl')
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Buat data_siswa.xlsx sintetis untuk benchmark.")
+    parser.add_argument('--students', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='data_siswa.xlsx')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    write_xlsx(generate_students(args.students, args.seed), args.output)
+    print(f"{args.students} siswa ditulis ke {args.output} dalam {time.perf_counter() - started:.1f} detik")
+
+
+if __name__ == '__main__':
+    main()
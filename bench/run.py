@@ -0,0 +1,301 @@
+# Benchmark & load test offline untuk app.py: Drive dan Gist diganti pengganti lokal (bench/fakes.py),
+# data siswa dibuat sintetis (bench/generate_data.py). Hasil ditulis sebagai JSON agar bisa
+# dibandingkan antar commit.
+#
+# Pemakaian:
+#   python -m bench.run --students 10000 --requests 2000 --concurrency 16 --output hasil.json
+#   python -m bench.run --scenario cek-kelulusan --scenario download-miss --drive-latency-ms 50
+# Keluar dengan status 1 jika status HTTP suatu skenario tidak sesuai yang seharusnya. Pemeriksaan
+# perilaku (jadwal, cache, rate limit) ada di bench/checks.py.
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from bench import fakes
+from bench.generate_data import generate_students, write_xlsx
+
+FOLDER_ID_SISWA = 'bench-folder-siswa'
+FOLDER_ID_SURAT = 'bench-folder-surat'
+SCENARIOS = ('cold-load', 'index', 'cek-kelulusan', 'api-cek-kelulusan', 'download-hit', 'download-miss')
+
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS melaporkan byte, Linux kilobyte
+    return usage // 1024 if sys.platform == 'darwin' else usage
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=REPO_ROOT,
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed, statuses, response_bytes):
+    latencies = sorted(latencies)
+    ms = lambda value: round(value * 1000, 3) if value is not None else None
+    return {
+        'requests': len(latencies),
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'latency_ms': {
+            'p50': ms(percentile(latencies, 50)),
+            'p95': ms(percentile(latencies, 95)),
+            'p99': ms(percentile(latencies, 99)),
+            'max': ms(latencies[-1] if latencies else None),
+            'mean': ms(sum(latencies) / len(latencies) if latencies else None),
+        },
+        'status': {str(code): count for code, count in sorted(statuses.items())},
+        'bytes_per_request': round(response_bytes / len(latencies), 1) if latencies else None,
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+
+# Jalankan make_request(client, i) sebanyak total kali dengan sejumlah thread paralel
+def run_load(app_module, make_request, total, concurrency):
+    latencies = []
+    statuses = {}
+    response_bytes = [0]
+    lock = threading.Lock()
+    local = threading.local()
+    counter = iter(range(total))
+
+    def worker():
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = app_module.app.test_client()
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            started = time.perf_counter()
+            response = make_request(client, i)
+            body = response.get_data()
+            elapsed = time.perf_counter() - started
+            response.close()
+            with lock:
+                latencies.append(elapsed)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                response_bytes[0] += len(body)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return summarize(latencies, time.perf_counter() - started, statuses, response_bytes[0])
+
+
+def lookup_payloads(students, count, seed):
+    # Campuran realistis: 80% benar, 10% tanggal salah, 10% NISN tidak ada
+    rng = random.Random(seed)
+    records = students[['nisn', 'tanggal_lahir']].astype(str).to_numpy()
+    payloads = []
+    for _ in range(count):
+        nisn, tanggal = records[rng.randrange(len(records))]
+        tanggal = tanggal[:10]
+        roll = rng.random()
+        if roll < 0.1:
+            tanggal = '1999-01-01'
+        elif roll < 0.2:
+            nisn = str(rng.randrange(1, 9_999_999))
+        payloads.append({'nisn': nisn, 'tanggal_lahir': tanggal})
+    return payloads
+
+
+# Jumlah status HTTP yang seharusnya per skenario. Status yang berbeda (mis. 500 dari tanggal yang
+# tidak terbaca, atau 404 untuk NISN yang ada) berarti optimasi mengubah perilaku, bukan hanya kecepatan.
+def expected_statuses(scenario, students, payloads, total):
+    if scenario != 'api-cek-kelulusan':
+        return {'200': total}
+    records = dict(students[['nisn', 'tanggal_lahir']].astype(str).to_numpy())
+    expected = {}
+    for payload in payloads[:total]:
+        tanggal = records.get(payload['nisn'])
+        code = '404' if tanggal is None else '200' if tanggal[:10] == payload['tanggal_lahir'] else '400'
+        expected[code] = expected.get(code, 0) + 1
+    return dict(sorted(expected.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline app.py dengan Drive & Gist lokal.")
+    parser.add_argument('--students', type=int, default=10_000)
+    parser.add_argument('--requests', type=int, default=1000, help="Jumlah request per skenario.")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--pdf-kb', type=int, default=200, help="Ukuran tiap file surat (KB).")
+    parser.add_argument('--drive-latency-ms', type=float, default=0.0)
+    parser.add_argument('--gist-latency-ms', type=float, default=0.0)
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                        help="Skenario yang dijalankan (boleh diulang, default: semua).")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help="File JSON hasil (default: stdout).")
+    parser.add_argument('--keep-workdir', action='store_true')
+    args = parser.parse_args()
+    scenarios = args.scenario or list(SCENARIOS)
+    output_path = os.path.abspath(args.output) if args.output else None
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+    # app.py membaca environment dan membuat direktori cache relatif ke direktori kerja saat import
+    workdir = tempfile.mkdtemp(prefix='ceklulus-bench-')
+    os.chdir(workdir)
+    os.environ.setdefault('CREDENTIALS_JSON', '{}')
+    os.environ['FOLDER_ID_SISWA'] = FOLDER_ID_SISWA
+    os.environ['FOLDER_ID_SURAT'] = FOLDER_ID_SURAT
+    os.environ['GIST_ID'] = 'bench'
+    os.environ.pop('VERCEL', None)
+    # Semua request bench datang dari satu IP; batas per IP/NISN dimatikan kecuali diatur eksplisit
+    for name in ('RATE_LIMIT_IP', 'RATE_LIMIT_NISN', 'RATE_LIMIT_DOWNLOAD'):
+        os.environ.setdefault(name, '0')
+    # Tanpa thread pemantau perubahan Drive agar jumlah panggilan Drive tetap sebanding antar run
+    os.environ.setdefault('DRIVE_CHANGES_INTERVAL', '0')
+
+    print(f"Membuat {args.students} siswa sintetis di {workdir}...", file=sys.stderr)
+    students = generate_students(args.students, args.seed)
+    xlsx_path = write_xlsx(students, os.path.join(workdir, 'data_siswa.xlsx'))
+    with open(xlsx_path, 'rb') as f:
+        xlsx_bytes = f.read()
+
+    import app as app_module
+
+    drive = fakes.FakeDrive(latency=args.drive_latency_ms / 1000)
+    now = datetime.now(timezone(timedelta(hours=7)))
+    schedule = [{
+        'mulai': (now - timedelta(days=1)).isoformat(),
+        'berakhir': (now + timedelta(days=1)).isoformat(),
+        'keterangan': 'Benchmark',
+        'waktu_input': now.strftime('%Y-%m-%d %H:%M:%S'),
+    }]
+    gist = fakes.FakeGist(app_module.GIST_FILENAME, schedule, latency=args.gist_latency_ms / 1000)
+    fakes.install(app_module, drive, gist)
+    app_module.app.logger.disabled = True
+
+    drive.put(FOLDER_ID_SISWA, app_module.FILE_NAME_SISWA, xlsx_bytes)
+    pdf_content = b'%PDF-1.4\n' + os.urandom(args.pdf_kb * 1024)
+    pdf_names = [name for name in students['file_pdf'].head(max(args.requests, 1))]
+    for name in pdf_names:
+        drive.put(FOLDER_ID_SURAT, name, pdf_content)
+
+    results = {}
+    payloads = lookup_payloads(students, args.requests, args.seed)
+
+    # Log print() dari app.py diarahkan ke stderr agar stdout berisi JSON saja
+    real_stdout = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        for scenario in scenarios:
+            print(f"Skenario {scenario}...", file=sys.stderr)
+            if scenario == 'cold-load':
+                # Unduh + parse xlsx tanpa snapshot, lalu muat ulang dari snapshot
+                shutil.rmtree(app_module.CACHE_DIR, ignore_errors=True)
+                os.makedirs(app_module.CACHE_DIR, exist_ok=True)
+                app_module.cache.flush()
+                started = time.perf_counter()
+                df = app_module.load_student_data_from_drive()
+                first = time.perf_counter() - started
+                started = time.perf_counter()
+                app_module.load_student_data_from_drive()
+                second = time.perf_counter() - started
+                started = time.perf_counter()
+                app_module.get_student_index()
+                index_build = time.perf_counter() - started
+                results[scenario] = {
+                    'rows': len(df),
+                    'download_and_parse_ms': round(first * 1000, 3),
+                    'snapshot_load_ms': round(second * 1000, 3),
+                    'first_index_ms': round(index_build * 1000, 3),
+                    'peak_rss_kb': peak_rss_kb(),
+                }
+                continue
+
+            if scenario == 'index':
+                make_request = lambda client, i: client.get('/')
+            elif scenario == 'cek-kelulusan':
+                make_request = lambda client, i: client.post('/cek-kelulusan', data=payloads[i])
+            elif scenario == 'api-cek-kelulusan':
+                make_request = lambda client, i: client.post('/api/cek-kelulusan', json=payloads[i])
+            elif scenario == 'download-hit':
+                cached_name = pdf_names[0]
+                app_module.download_file_from_drive(cached_name, FOLDER_ID_SURAT)
+                make_request = lambda client, i: client.get(f'/download/{cached_name}')
+            else:  # download-miss: setiap request meminta file yang belum di-cache
+                for name in pdf_names:
+                    path = app_module.cache.path(name)
+                    if path and os.path.exists(path):
+                        app_module.cache.remove(name)
+                make_request = lambda client, i: client.get(f'/download/{pdf_names[i % len(pdf_names)]}')
+
+            # Satu request pemanasan agar indeks siswa & jadwal sudah terisi
+            app_module.app.test_client().get('/').close()
+            results[scenario] = run_load(app_module, make_request, args.requests, args.concurrency)
+            results[scenario]['expected_status'] = expected_statuses(scenario, students, payloads, args.requests)
+    finally:
+        sys.stdout = real_stdout
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'args': vars(args),
+        },
+        'backend_calls': {'drive': drive.calls, 'gist': gist.calls},
+        'cache': app_module.cache.stats(),
+        'scenarios': results,
+    }
+    output = json.dumps(report, indent=2)
+    if output_path:
+        with open(output_path, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if not args.keep_workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    failed = [
+        name for name, result in results.items()
+        if 'expected_status' in result and result['status'] != result['expected_status']
+    ]
+    for name in failed:
+        print(f"Status skenario {name} tidak sesuai: {results[name]['status']} "
+              f"(seharusnya {results[name]['expected_status']})", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
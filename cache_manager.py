@@ -0,0 +1,279 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from werkzeug.utils import safe_join
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+def _gevent_patched():
+    # Di worker gevent, flock yang blocking akan menahan seluruh event loop worker
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched("socket")
+
+
+# Manajer direktori cache: batas ukuran & jumlah file dengan eviksi LRU/LFU, penulisan atomik,
+# single-flight antar thread/worker, catatan versi Drive, dan statistik hit/miss/eviksi.
+# Indeks (ukuran, jumlah hit, akses terakhir, versi) disimpan di .cache_index.json dalam direktori cache.
+class CacheManager:
+    INDEX_NAME = ".cache_index.json"
+    FLUSH_EVERY = 50  # Simpan indeks ke disk setiap N akses
+    LOCK_POLL_INTERVAL = 0.05  # Jeda antar percobaan file lock di mode gevent (detik)
+
+    def __init__(self, root, max_bytes=0, max_entries=0, policy="lru", pinned=()):
+        self.root = os.path.abspath(root)
+        self.lock_dir = os.path.join(self.root, ".locks")
+        self.index_path = os.path.join(self.root, self.INDEX_NAME)
+        self.max_bytes = max_bytes  # 0 = tanpa batas
+        self.max_entries = max_entries  # 0 = tanpa batas
+        self.policy = policy.lower()
+        self.pinned = set(pinned)  # File yang ikut dihitung tapi tidak pernah dievict
+        self.counters = {"hits": 0, "misses": 0, "stale": 0, "writes": 0, "evictions": 0, "evicted_bytes": 0}
+
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.RLock()
+        self._index = self._read_index()
+        self._pending_hits = {}
+        self._accesses = 0
+        self._flight_locks = {}
+        self._flight_guard = threading.Lock()
+
+    # ---- path & lookup ----
+
+    def path(self, name):
+        # None jika nama file mencoba keluar dari direktori cache
+        return safe_join(self.root, name)
+
+    def get(self, name, validate=None):
+        # Path file cache jika ada (dan lolos validate), dicatat sebagai hit; selain itu miss
+        path = self.path(name)
+        stale = False
+        if path and os.path.isfile(path):
+            if validate is None or validate(name):
+                self._record_hit(name)
+                return path
+            stale = True
+        # Counter dibaca /metrics dan `flask cache-stats`, jadi ditambah di bawah lock seperti hits
+        with self._lock:
+            if stale:
+                self.counters["stale"] += 1
+            self.counters["misses"] += 1
+        return None
+
+    def get_version(self, name, fresh=False):
+        # Versi yang dicatat worker lain baru masuk ke indeks proses ini saat flush berikutnya;
+        # fresh=True membaca ulang indeks di disk (ditulis atomik, jadi aman dibaca tanpa lock)
+        if fresh:
+            on_disk = self._read_index().get(name)
+            if on_disk is not None:
+                with self._lock:
+                    self._index.setdefault(name, {})["version"] = on_disk.get("version")
+        return self._index.get(name, {}).get("version")
+
+    def set_version(self, name, version):
+        with self._lock:
+            # None disimpan eksplisit agar versi lama di disk ikut terhapus saat flush
+            self._index.setdefault(name, {})["version"] = version
+            self.flush()
+
+    # ---- single-flight ----
+
+    @contextmanager
+    def _file_lock(self, key):
+        if fcntl is None:
+            # Windows: cukup lock di dalam proses
+            yield
+            return
+        os.makedirs(self.lock_dir, exist_ok=True)
+        lock_path = os.path.join(self.lock_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".lock")
+        with open(lock_path, "a") as f:
+            if _gevent_patched():
+                # Coba tanpa blocking lalu tidur; time.sleep sudah di-patch jadi greenlet lain tetap jalan
+                while True:
+                    try:
+                        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        time.sleep(self.LOCK_POLL_INTERVAL)
+            else:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @contextmanager
+    def single_flight(self, key):
+        # Hanya satu thread (dan, lewat file lock, satu worker gunicorn) yang memegang key yang sama;
+        # yang lain menunggu lalu memakai hasilnya
+        with self._flight_guard:
+            entry = self._flight_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0], self._file_lock(key):
+                yield
+        finally:
+            with self._flight_guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._flight_locks[key]
+
+    # ---- tulis & hapus ----
+
+    @contextmanager
+    def open_write(self, name, version=None):
+        # Tulis ke file sementara lalu rename atomik ke cache setelah blok selesai tanpa error
+        path = self.path(name)
+        if path is None:
+            raise ValueError(f"Nama file cache tidak valid: {name}")
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                yield fh
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.register(name, version)
+
+    def register(self, name, version=None):
+        # Catat file yang baru ditulis ke cache lalu tegakkan batas ukuran
+        path = self.path(name)
+        with self._lock:
+            entry = self._index.setdefault(name, {})
+            entry["size"] = os.path.getsize(path)
+            entry["last_access"] = time.time()
+            entry.setdefault("hits", 0)
+            entry["version"] = version
+            self.counters["writes"] += 1
+        self.enforce_limits(keep=(name,))
+
+    def remove(self, name):
+        path = self.path(name)
+        with self._lock:
+            if path and os.path.exists(path):
+                os.remove(path)
+            self._index.pop(name, None)
+            self._pending_hits.pop(name, None)
+            self.flush()
+
+    # ---- eviksi ----
+
+    def _scan(self):
+        # Ukuran sebenarnya diambil dari filesystem; file sementara, lock, dan metadata (dotfile) diabaikan
+        entries = {}
+        with os.scandir(self.root) as it:
+            for item in it:
+                if item.name.startswith(".") or not item.is_file():
+                    continue
+                stat = item.stat()
+                entries[item.name] = (stat.st_size, stat.st_mtime)
+        return entries
+
+    def _eviction_key(self, name, mtime):
+        entry = self._index.get(name, {})
+        last_access = entry.get("last_access", mtime)
+        hits = entry.get("hits", 0) + self._pending_hits.get(name, 0)
+        if self.policy == "lfu":
+            return (hits, last_access)
+        return (last_access, hits)
+
+    def enforce_limits(self, keep=()):
+        if not self.max_bytes and not self.max_entries:
+            self.flush()
+            return []
+        evicted = []
+        with self._lock, self._file_lock(self.INDEX_NAME + ".evict"):
+            files = self._scan()
+            total_bytes = sum(size for size, _ in files.values())
+            total_entries = len(files)
+            candidates = sorted(
+                (name for name in files if name not in self.pinned and name not in keep),
+                key=lambda name: self._eviction_key(name, files[name][1])
+            )
+            for name in candidates:
+                over_bytes = self.max_bytes and total_bytes > self.max_bytes
+                over_entries = self.max_entries and total_entries > self.max_entries
+                if not over_bytes and not over_entries:
+                    break
+                size = files[name][0]
+                try:
+                    os.remove(os.path.join(self.root, name))
+                except FileNotFoundError:
+                    pass
+                self._index.pop(name, None)
+                self._pending_hits.pop(name, None)
+                total_bytes -= size
+                total_entries -= 1
+                self.counters["evictions"] += 1
+                self.counters["evicted_bytes"] += size
+                evicted.append(name)
+            self.flush()
+        if evicted:
+            print(f"Cache penuh, {len(evicted)} file dievict ({self.policy}): {', '.join(evicted[:5])}")
+        return evicted
+
+    # ---- indeks ----
+
+    def _read_index(self):
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _record_hit(self, name):
+        with self._lock:
+            self.counters["hits"] += 1
+            entry = self._index.setdefault(name, {})
+            entry["last_access"] = time.time()
+            self._pending_hits[name] = self._pending_hits.get(name, 0) + 1
+            self._accesses += 1
+            if self._accesses % self.FLUSH_EVERY == 0:
+                self.flush()
+
+    def flush(self):
+        # Gabungkan dengan indeks di disk agar hit & versi dari worker lain tidak tertimpa
+        with self._lock, self._file_lock(self.INDEX_NAME):
+            on_disk = self._read_index()
+            for name, entry in self._index.items():
+                merged = on_disk.get(name, {})
+                hits = merged.get("hits", 0) + self._pending_hits.get(name, 0)
+                last_access = max(merged.get("last_access", 0), entry.get("last_access", 0))
+                merged.update(entry)
+                merged["hits"] = hits
+                merged["last_access"] = last_access
+                if merged.get("version") is None:
+                    merged.pop("version", None)
+                on_disk[name] = merged
+            # Buang entri untuk file yang sudah tidak ada
+            on_disk = {
+                name: entry for name, entry in on_disk.items()
+                if os.path.exists(os.path.join(self.root, name))
+            }
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(on_disk, f)
+            os.replace(tmp_path, self.index_path)
+            self._index = on_disk
+            self._pending_hits = {}
+
+    def stats(self):
+        files = self._scan()
+        return dict(
+            self.counters,
+            entries=len(files),
+            bytes=sum(size for size, _ in files.values()),
+            max_bytes=self.max_bytes,
+            max_entries=self.max_entries,
+            policy=self.policy
+        )
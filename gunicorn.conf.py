@@ -0,0 +1,11 @@
+import os
+
+# Konfigurasi gunicorn (dibaca otomatis saat `gunicorn app:app` dijalankan dari direktori ini).
+# ASYNC_MODE=gevent memakai worker gevent (butuh `pip install gevent`): socket di-patch sehingga
+# panggilan Gist/Drive yang menunggu jaringan tidak memblokir worker, dan satu worker bisa melayani
+# hingga ASYNC_WORKER_CONNECTIONS request bersamaan dengan biaya memori per greenlet, bukan per thread.
+ASYNC_MODE = os.getenv("ASYNC_MODE", "sync").lower()
+
+if ASYNC_MODE == "gevent":
+    worker_class = "gevent"
+    worker_connections = int(os.getenv("ASYNC_WORKER_CONNECTIONS", "1000"))
@@ -0,0 +1,101 @@
+import os
+import sys
+import json
+import subprocess
+
+
+# Laporan waktu import (cold start) dari `python -X importtime -c "import app"` di proses baru:
+# total waktu import modul target, modul teratas menurut waktu kumulatif, dan modul berat yang
+# seharusnya lazy (lihat lazy.py) tetapi ikut dimuat saat import. Dipakai lewat `flask import-profile`
+# atau langsung: python import_profile.py [--top N] [--budget-ms MS] [--json]
+HEAVY_MODULES = (
+    "pandas", "numpy", "openpyxl", "requests", "googleapiclient.discovery", "googleapiclient.http",
+    "google.oauth2.service_account", "google_auth_httplib2", "httplib2", "dateutil.parser",
+)
+
+
+def run_importtime(target="app", env=None):
+    env = dict(os.environ if env is None else env)
+    env["PRELOAD_ON_START"] = "0"  # Thread warm-up tidak boleh ikut mengimpor modul selama diukur
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True, text=True, env=env
+    )
+    if result.returncode != 0:
+        lines = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError(f"Import {target} gagal:\n" + "\n".join(lines[-20:]))
+    return result.stderr
+
+
+# Baris "import time: self [us] | cumulative | nama" -> (nama, kedalaman, self_us, cumulative_us)
+def parse(stderr):
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # Baris judul kolom
+        raw_name = parts[2].rstrip()
+        name = raw_name.lstrip()
+        depth = (len(raw_name) - len(name) - 1) // 2
+        entries.append((name, depth, int(parts[0]), int(parts[1])))
+    return entries
+
+
+def summarize(entries, target="app", top=15):
+    target_entry = next((entry for entry in entries if entry[0] == target and entry[1] == 0), None)
+    if target_entry is None:
+        raise RuntimeError(f"Modul {target} tidak ditemukan di output importtime.")
+    # Baris importtime ditulis setelah modul selesai dimuat, jadi dependensi target ada tepat sebelum
+    # baris target dengan kedalaman > 0 (atau modul sebelum target yang sudah dimuat interpreter)
+    end = entries.index(target_entry)
+    start = end
+    while start > 0 and entries[start - 1][1] > 0:
+        start -= 1
+    children = entries[start:end]
+    direct = sorted((entry for entry in children if entry[1] == 1), key=lambda entry: -entry[3])
+    loaded = {entry[0] for entry in entries}
+    return {
+        "target": target,
+        "total_ms": round(target_entry[3] / 1000, 1),
+        "self_ms": round(target_entry[2] / 1000, 1),
+        "modules": len(children) + 1,
+        "top": [{"module": name, "cumulative_ms": round(cumulative / 1000, 1)}
+                for name, _, _, cumulative in direct[:top]],
+        "eager_heavy": [name for name in HEAVY_MODULES if name in loaded],
+    }
+
+
+def format_report(summary):
+    lines = [
+        f"Import {summary['target']}: {summary['total_ms']:.1f} ms "
+        f"(kode modul sendiri {summary['self_ms']:.1f} ms, {summary['modules']} modul)",
+        "Modul teratas (kumulatif):",
+    ]
+    lines.extend(f"  {item['cumulative_ms']:8.1f} ms  {item['module']}" for item in summary["top"])
+    eager = ", ".join(summary["eager_heavy"]) or "-"
+    lines.append(f"Modul berat yang ikut dimuat saat import: {eager}")
+    return "\n".join(lines)
+
+
+def profile(target="app", top=15):
+    return summarize(parse(run_importtime(target)), target, top)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    arg_parser = argparse.ArgumentParser(description="Profil waktu import (cold start) aplikasi.")
+    arg_parser.add_argument("--target", default="app")
+    arg_parser.add_argument("--top", type=int, default=15)
+    arg_parser.add_argument("--budget-ms", type=float, default=None,
+                            help="Keluar dengan status 1 jika total import melebihi batas ini.")
+    arg_parser.add_argument("--json", action="store_true")
+    args = arg_parser.parse_args()
+
+    summary = profile(args.target, args.top)
+    print(json.dumps(summary) if args.json else format_report(summary))
+    if args.budget_ms is not None and summary["total_ms"] > args.budget_ms:
+        print(f"Melebihi batas {args.budget_ms:.0f} ms.", file=sys.stderr)
+        sys.exit(1)
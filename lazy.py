@@ -0,0 +1,88 @@
+import time
+import threading
+import importlib
+
+import metrics
+
+
+# Import modul berat (pandas, numpy, klien Google API, requests, dateutil) ditunda sampai pertama kali
+# dipakai, sehingga cold start di Vercel untuk request seperti / tidak membayar biaya import yang tidak
+# dibutuhkan. Proxy meneruskan akses atribut ke modul/objek aslinya, jadi pemakaian `pd.DataFrame(...)`
+# tidak berubah. Durasi import pertama dicatat per modul untuk /metrics dan `flask import-profile`.
+import_times = {}  # nama modul -> detik import pertama (termasuk dependensinya)
+
+
+def load_module(name):
+    # importlib sudah memakai lock import per modul, jadi aman dipanggil dari banyak thread
+    started = time.perf_counter()
+    with metrics.span("lazy_import"):
+        module = importlib.import_module(name)
+    import_times.setdefault(name, time.perf_counter() - started)
+    return module
+
+
+# Muat sekaligus di luar jalur request (hook warm-up)
+def preload(names):
+    for name in names:
+        load_module(name)
+
+
+class LazyModule:
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+
+    def _load(self):
+        module = self.__dict__["_module"]
+        if module is None:
+            module = self.__dict__["_module"] = load_module(self._name)
+        return module
+
+    @property
+    def loaded(self):
+        return self.__dict__["_module"] is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<LazyModule {self._name!r} ({state})>"
+
+
+# Fungsi/kelas dari modul lazy, mis. lazy_callable("googleapiclient.discovery", "build")
+def lazy_callable(module_name, attr):
+    module = LazyModule(module_name)
+
+    def call(*args, **kwargs):
+        return getattr(module, attr)(*args, **kwargs)
+
+    call.__name__ = attr
+    call.__qualname__ = f"{module_name}.{attr}"
+    return call
+
+
+# Objek yang dibuat saat pertama kali dipakai (mis. requests.Session dengan adapter pool)
+class LazyObject:
+    def __init__(self, factory):
+        self.__dict__["_factory"] = factory
+        self.__dict__["_value"] = None
+        self.__dict__["_lock"] = threading.Lock()
+
+    def _get(self):
+        value = self.__dict__["_value"]
+        if value is None:
+            with self._lock:
+                value = self.__dict__["_value"]
+                if value is None:
+                    value = self.__dict__["_value"] = self._factory()
+        return value
+
+    def __getattr__(self, attr):
+        return getattr(self._get(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._get(), attr, value)
@@ -0,0 +1,136 @@
+import time
+import threading
+from contextlib import contextmanager
+from flask import g, has_request_context
+
+
+# Instrumentasi ringan tanpa dependensi tambahan: counter, histogram, dan span waktu per tahap.
+# Nilai disimpan per proses (tiap worker gunicorn punya angka sendiri) dan diekspor dalam format
+# teks Prometheus lewat endpoint /metrics.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "ceklulus_stage_duration_seconds": "Durasi tiap tahap (Gist, Drive, parse Excel, render, dst).",
+    "ceklulus_request_duration_seconds": "Durasi request HTTP per endpoint.",
+    "ceklulus_external_calls_total": "Jumlah panggilan ke API eksternal.",
+    "ceklulus_errors_total": "Jumlah error per tahap dan jenis.",
+    "ceklulus_schedule_cache_total": "Hasil lookup cache jadwal.",
+    "ceklulus_page_cache_total": "Hasil lookup cache halaman index yang sudah dirender.",
+    "ceklulus_student_index_total": "Hasil lookup indeks data siswa di memori (hit/stale/miss).",
+    "ceklulus_admission_rejected_total": "Request yang ditolak admission control (429/503).",
+    "ceklulus_admission_active": "Request yang sedang diproses di bawah batas konkurensi.",
+    "ceklulus_admission_waiting": "Request yang menunggu di antrean admission control.",
+    "ceklulus_drive_changes_total": "File cache yang diperbarui/dihapus karena feed perubahan Drive.",
+    "ceklulus_lazy_import_seconds": "Durasi import pertama modul yang dimuat lazy.",
+    "ceklulus_cache_events_total": "Hit/miss/eviksi cache file.",
+    "ceklulus_cache_bytes": "Ukuran direktori cache (byte).",
+    "ceklulus_cache_entries": "Jumlah file di direktori cache.",
+}
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(label_key, extra=()):
+    items = list(label_key) + list(extra)
+    if not items:
+        return ""
+    escaped = (
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in items
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+class Registry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._counters = {}  # name -> {label_key: value}
+        self._histograms = {}  # name -> {label_key: [bucket_counts, sum, count]}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self, gauges=(), counters=()):
+        # gauges/counters: iterable (nama, labels, nilai) yang dihitung saat scrape
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, (bucket_counts, total, count) in sorted(series.items()):
+                    for bound, bucket_count in zip(self.buckets, bucket_counts):
+                        lines.append(f"{name}_bucket{_format_labels(key, [('le', bound)])} {bucket_count}")
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {total}")
+                    lines.append(f"{name}_count{_format_labels(key)} {count}")
+
+        seen = set()
+        for metric_type, samples in (("gauge", gauges), ("counter", counters)):
+            for name, labels, value in samples:
+                if name not in seen:
+                    lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                    lines.append(f"# TYPE {name} {metric_type}")
+                    seen.add(name)
+                lines.append(f"{name}{_format_labels(_label_key(labels))} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+inc = registry.inc
+observe = registry.observe
+
+
+# Ukur durasi satu tahap. Durasi masuk histogram dan, jika dalam request, ke daftar span request
+# (dipakai log request lambat). Exception dicatat per jenis lalu diteruskan.
+@contextmanager
+def span(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        inc("ceklulus_errors_total", stage=stage, type=type(e).__name__)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        observe("ceklulus_stage_duration_seconds", elapsed, stage=stage)
+        if has_request_context():
+            spans = g.setdefault("metrics_spans", [])
+            spans.append((stage, elapsed))
+
+
+def request_spans():
+    if not has_request_context():
+        return []
+    return g.get("metrics_spans", [])
+
+
+# Ringkas span per tahap untuk log, misalnya "gist_fetch=702.1ms render_template=3.2ms"
+def format_spans(spans):
+    totals = {}
+    for stage, elapsed in spans:
+        totals[stage] = totals.get(stage, 0.0) + elapsed
+    return " ".join(f"{stage}={elapsed * 1000:.1f}ms" for stage, elapsed in totals.items())
@@ -0,0 +1,142 @@
+import os
+import json
+import uuid
+import hashlib
+import tempfile
+import threading
+
+
+# Penyimpanan jadwal lokal (write-through): admin menulis ke file ini dan langsung melihat hasilnya,
+# sedangkan Gist disinkronkan belakangan. File berisi:
+#   base    - isi Gist terakhir yang diketahui (None jika belum pernah diambil)
+#   etag    - ETag Gist untuk base, dipakai untuk mengecek revisi sebelum menulis
+#   pending - operasi yang belum terkirim ke Gist ({"op": "add", "entry": ...} / {"op": "delete", "id": ...})
+#   entries - base + pending, yang dibaca aplikasi
+# Setiap entri punya "id" tetap sehingga operasi bisa diterapkan ulang di atas isi Gist terbaru
+# tanpa saling menimpa (tambah idempoten per id, hapus per id).
+class ScheduleStore:
+    def __init__(self, path, locker):
+        self.path = os.path.abspath(path)
+        self.locker = locker  # Context manager lock antar thread/worker, mis. CacheManager.single_flight
+        self._lock = threading.Lock()
+        self._state = None
+        self._state_key = None
+
+    # ---- id & operasi ----
+
+    @staticmethod
+    def new_id():
+        return uuid.uuid4().hex[:12]
+
+    @staticmethod
+    def ensure_ids(entries):
+        # Entri lama di Gist belum punya id: pakai hash isinya agar sama di semua worker/instance
+        result = []
+        seen = set()
+        for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            entry = dict(entry)
+            entry_id = entry.get("id")
+            if not entry_id:
+                content = json.dumps(entry, sort_keys=True, ensure_ascii=False)
+                entry_id = "h" + hashlib.sha1(content.encode("utf-8")).hexdigest()[:11]
+            suffix = 1
+            unique_id = str(entry_id)
+            while unique_id in seen:
+                suffix += 1
+                unique_id = f"{entry_id}-{suffix}"
+            entry["id"] = unique_id
+            seen.add(unique_id)
+            result.append(entry)
+        return result
+
+    @staticmethod
+    def apply_ops(base, ops):
+        entries = [dict(entry) for entry in base]
+        for op in ops:
+            if op["op"] == "add":
+                if not any(entry["id"] == op["entry"]["id"] for entry in entries):
+                    entries.append(dict(op["entry"]))
+            elif op["op"] == "delete":
+                entries = [entry for entry in entries if entry["id"] != op["id"]]
+        return entries
+
+    # ---- baca & tulis file ----
+
+    def _file_key(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def version(self):
+        # Berubah setiap kali file ditulis (oleh proses mana pun)
+        return self._file_key()
+
+    def read(self):
+        key = self._file_key()
+        with self._lock:
+            if self._state is not None and key == self._state_key:
+                return self._state
+            state = {"base": None, "etag": None, "pending": [], "entries": []}
+            if key is not None:
+                try:
+                    with open(self.path) as f:
+                        state.update(json.load(f))
+                except (OSError, ValueError) as e:
+                    print(f"File jadwal lokal tidak bisa dibaca, diabaikan: {e}")
+            self._state, self._state_key = state, key
+            return state
+
+    def _write(self, state):
+        state["entries"] = self.apply_ops(state["base"] or [], state["pending"])
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix=".", suffix=".part")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(state, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        with self._lock:
+            self._state, self._state_key = state, self._file_key()
+        return state
+
+    def _update(self, change):
+        # Baca-ubah-tulis di bawah lock agar penulisan dari worker lain tidak hilang
+        with self.locker("schedule-store"):
+            self._state_key = None  # Paksa baca ulang dari disk
+            state = dict(self.read())
+            state["pending"] = list(state["pending"])
+            change(state)
+            return self._write(state)
+
+    # ---- operasi publik ----
+
+    def add(self, entry):
+        entry = dict(entry, id=self.new_id())
+        self._update(lambda state: state["pending"].append({"op": "add", "op_id": self.new_id(), "entry": entry}))
+        return entry
+
+    def delete(self, entry_id):
+        found = any(entry["id"] == entry_id for entry in self.read()["entries"])
+        if found:
+            self._update(lambda state: state["pending"].append({"op": "delete", "op_id": self.new_id(), "id": entry_id}))
+        return found
+
+    def apply_remote(self, remote_entries, etag):
+        # Isi Gist terbaru menjadi base; operasi yang belum terkirim diterapkan ulang di atasnya
+        def change(state):
+            state["base"] = self.ensure_ids(remote_entries)
+            state["etag"] = etag
+        return self._update(change)
+
+    def mark_synced(self, op_ids, content, etag):
+        # Operasi yang sudah masuk ke Gist dibuang; yang ditambahkan selama sinkronisasi tetap pending
+        def change(state):
+            state["base"] = content
+            state["etag"] = etag
+            state["pending"] = [op for op in state["pending"] if op["op_id"] not in op_ids]
+        return self._update(change)